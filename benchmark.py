@@ -0,0 +1,92 @@
+import argparse
+import json
+import sys
+from modules.benchmark import BENCHMARKS, run_benchmarks
+from modules.allocation import ALLOCATION_STRATEGIES
+from modules.schedule import BACKFILL_POLICIES
+
+parser = argparse.ArgumentParser(
+    description="合成ワークロードでスケジューラの主要な処理の時間を計測する"
+)
+parser.add_argument(
+    "--points",
+    nargs="+",
+    default=["100,360,180,50", "1000,1440,720,200"],
+    help="NODE_SIZE,SCHEDULE_TIMESTEP_WINDOW,BACKFILL_TIMESTEP_WINDOW,WATCH_JOB_SIZE",
+)
+parser.add_argument("--benchmarks", nargs="+", default=BENCHMARKS, choices=BENCHMARKS)
+parser.add_argument("--job-count", type=int, default=5000)
+parser.add_argument("--run-job-count", type=int, default=500)
+parser.add_argument("--timestep-seconds", type=int, default=60)
+parser.add_argument("--warmup-timesteps", type=int, default=10)
+parser.add_argument("--repeat", type=int, default=5)
+parser.add_argument("--seed", type=int, default=0)
+parser.add_argument("--node-size-exponent", type=float, default=2.0)
+parser.add_argument("--median-runtime", type=float, default=3600)
+parser.add_argument("--runtime-sigma", type=float, default=1.5)
+parser.add_argument("--prediction-bias", type=float, default=0.0)
+parser.add_argument("--prediction-sigma", type=float, default=0.6)
+parser.add_argument("--event-driven", action="store_true")
+parser.add_argument("--columnar-workload", action="store_true")
+parser.add_argument("--vectorized-resource", action="store_true")
+parser.add_argument("--resource-map-backend", default="dense")
+parser.add_argument("--vectorized-search", action="store_true")
+parser.add_argument("--circular-time-axis", action="store_true")
+parser.add_argument(
+    "--backfill-policy", default="conservative", choices=BACKFILL_POLICIES
+)
+parser.add_argument("--skip-unchanged", action="store_true")
+parser.add_argument("--feasibility-cache", action="store_true")
+parser.add_argument("--backfill-workers", type=int, default=1)
+parser.add_argument(
+    "--allocation-strategy", default="first_fit", choices=list(ALLOCATION_STRATEGIES)
+)
+parser.add_argument("--rack-size", type=int, default=32)
+parser.add_argument("--packed-free-mask", action="store_true")
+parser.add_argument(
+    "--compiled-kernels",
+    default="auto",
+    choices=["auto", "on", "off"],
+    help="numba でコンパイルしたカーネルを使うか（auto: numba があれば使う）",
+)
+parser.add_argument("--output", help="結果を書き出すJSONファイル（省略時は標準出力）")
+args = parser.parse_args()
+
+results = run_benchmarks(
+    [tuple(int(value) for value in point.split(",")) for point in args.points],
+    args.job_count,
+    args.run_job_count,
+    timestep_seconds=args.timestep_seconds,
+    warmup_timesteps=args.warmup_timesteps,
+    repeat=args.repeat,
+    seed=args.seed,
+    benchmarks=args.benchmarks,
+    workload_options={
+        "node_size_exponent": args.node_size_exponent,
+        "median_runtime": args.median_runtime,
+        "runtime_sigma": args.runtime_sigma,
+        "prediction_bias": args.prediction_bias,
+        "prediction_sigma": args.prediction_sigma,
+    },
+    event_driven=args.event_driven,
+    columnar_workload=args.columnar_workload,
+    vectorized_resource=args.vectorized_resource,
+    resource_map_backend=args.resource_map_backend,
+    vectorized_search=args.vectorized_search,
+    circular_time_axis=args.circular_time_axis,
+    backfill_policy=args.backfill_policy,
+    skip_unchanged=args.skip_unchanged,
+    feasibility_cache=args.feasibility_cache,
+    backfill_workers=args.backfill_workers,
+    allocation_strategy=args.allocation_strategy,
+    rack_size=args.rack_size,
+    packed_free_mask=args.packed_free_mask,
+    compiled_kernels={"auto": None, "on": True, "off": False}[args.compiled_kernels],
+)
+
+if args.output:
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+else:
+    json.dump(results, sys.stdout, indent=2)
+    print()
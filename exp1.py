@@ -1,9 +1,10 @@
-import pandas as pd
+from modules.dataset import DATA_LIST, load_sampled_jobs
 from modules.simulator import Simulator
 import argparse
 
 parser = argparse.ArgumentParser()
 parser.add_argument("method", type=int)
+parser.add_argument("--resume", action="store_true")
 args = parser.parse_args()
 
 DEBUG = False
@@ -14,6 +15,8 @@ BACKFILL_TIMESTEP_WINDOW = 1440
 WATCH_JOB_SIZE = 300
 TIMESTEP_SECONDS = 60
 SAMPLE_SIZE = 100000
+# チェックポイントを保存する間隔（秒）
+CHECKPOINT_SECONDS = 600
 
 if DEBUG:
     NODE_SIZE = 10
@@ -33,56 +36,33 @@ print(f"Sample size: {SAMPLE_SIZE}")
 print("\n")
 
 
-data_list = [
-    {
-        "name": "jobs-proposed-method",
-        "path": "data/jobs-proposed-method.parquet",
-    },
-    {
-        "name": "jobs-previous-method",
-        "path": "data/jobs-previous-method.parquet",
-    },
-    {
-        "name": "jobs-last2",
-        "path": "data/jobs-last2.parquet",
-    },
-    {
-        "name": "jobs-user-estimation",
-        "path": "data/jobs-user-estimation.parquet",
-    },
-]
-
-df_list = [pd.read_parquet(data["path"]) for data in data_list]
-common_log_ids = df_list[0][["log_id", "y_pred", "ehost_num"]]
-for df in df_list[1:]:
-    common_log_ids = pd.merge(
-        common_log_ids,
-        df[["log_id", "y_pred"]],
-        on="log_id",
-        how="inner",
-        suffixes=("", "_"),
-    )
-
-# リソースに割り当て可能なジョブに絞り込み
-common_log_ids["y_pred_max"] = common_log_ids.filter(like="y_pred").max(axis=1)
-common_log_ids = common_log_ids[
-    common_log_ids["y_pred_max"] < SCHEDULE_TIMESTEP_WINDOW * TIMESTEP_SECONDS
-]
-common_log_ids = common_log_ids[common_log_ids["ehost_num"] < NODE_SIZE]
-
-# 共通するlog_idで絞り込み
-sampled_log_ids = common_log_ids.sample(SAMPLE_SIZE, random_state=1030)[["log_id"]]
-df_list = [pd.merge(sampled_log_ids, df, on="log_id", how="inner") for df in df_list]
-
-data = data_list[args.method]
-df = df_list[args.method]
-print(f"Running {data['name']}...")
-simulator = Simulator(
-    df,
+data_list = DATA_LIST
+# 共通するジョブの結合・絞り込み・サンプリングの結果は data/cache にキャッシュされる
+df_list = load_sampled_jobs(
     NODE_SIZE,
     SCHEDULE_TIMESTEP_WINDOW,
-    BACKFILL_TIMESTEP_WINDOW,
-    WATCH_JOB_SIZE,
     TIMESTEP_SECONDS,
+    SAMPLE_SIZE,
+    seed=1030,
 )
-simulator.run()
+
+data = data_list[args.method]
+df = df_list[args.method]
+checkpoint_path = f"exp1-method{args.method}-checkpoint.pkl"
+if args.resume:
+    print(f"Resuming {data['name']} from {checkpoint_path}...")
+    simulator = Simulator.load_checkpoint(checkpoint_path)
+else:
+    print(f"Running {data['name']}...")
+    simulator = Simulator(
+        df,
+        NODE_SIZE,
+        SCHEDULE_TIMESTEP_WINDOW,
+        BACKFILL_TIMESTEP_WINDOW,
+        WATCH_JOB_SIZE,
+        TIMESTEP_SECONDS,
+        checkpoint_path=checkpoint_path,
+        checkpoint_seconds=CHECKPOINT_SECONDS,
+        result_path=f"exp1-method{args.method}-results.parquet",
+    )
+simulator.run(1, args.method, resume=args.resume)
@@ -1,4 +1,4 @@
-import pandas as pd
+from modules.dataset import DATA_LIST, load_sampled_jobs
 from modules.simulator import Simulator
 import argparse
 import time
@@ -37,46 +37,15 @@ print(f"Sample size: {SAMPLE_SIZE}")
 print("\n")
 
 
-data_list = [
-    {
-        "name": "jobs-proposed-method",
-        "path": "data/jobs-proposed-method.parquet",
-    },
-    {
-        "name": "jobs-previous-method",
-        "path": "data/jobs-previous-method.parquet",
-    },
-    {
-        "name": "jobs-last2",
-        "path": "data/jobs-last2.parquet",
-    },
-    {
-        "name": "jobs-user-estimation",
-        "path": "data/jobs-user-estimation.parquet",
-    },
-]
-
-df_list = [pd.read_parquet(data["path"]) for data in data_list]
-common_log_ids = df_list[0][["log_id", "y_pred", "ehost_num"]]
-for df in df_list[1:]:
-    common_log_ids = pd.merge(
-        common_log_ids,
-        df[["log_id", "y_pred"]],
-        on="log_id",
-        how="inner",
-        suffixes=("", "_"),
-    )
-
-# リソースに割り当て可能なジョブに絞り込み
-common_log_ids["y_pred_max"] = common_log_ids.filter(like="y_pred").max(axis=1)
-common_log_ids = common_log_ids[
-    common_log_ids["y_pred_max"] < SCHEDULE_TIMESTEP_WINDOW * TIMESTEP_SECONDS
-]
-common_log_ids = common_log_ids[common_log_ids["ehost_num"] < NODE_SIZE]
-
-# 共通するlog_idで絞り込み
-sampled_log_ids = common_log_ids.sample(SAMPLE_SIZE, random_state=1030)[["log_id"]]
-df_list = [pd.merge(sampled_log_ids, df, on="log_id", how="inner") for df in df_list]
+data_list = DATA_LIST
+# 共通するジョブの結合・絞り込み・サンプリングの結果は data/cache にキャッシュされる
+df_list = load_sampled_jobs(
+    NODE_SIZE,
+    SCHEDULE_TIMESTEP_WINDOW,
+    TIMESTEP_SECONDS,
+    SAMPLE_SIZE,
+    seed=1030,
+)
 
 data = data_list[args.method]
 df = df_list[args.method]
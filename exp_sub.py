@@ -2,6 +2,8 @@ import subprocess
 import os
 
 exp = 7
+# 76コアで4手法×19シードを同時に実行する
+seeds = " ".join(str(seed) for seed in range(exp, exp + 19))
 
 TEMPLATE = """#!/bin/bash
 
@@ -16,14 +18,13 @@ module load BasePy/2023
 module --force switch python3/3.6 python3/3.8
 export NUMEXPR_MAX_THREADS=76
 source /sqfs/work/G15384/u6b815/job-scheduling-simulator/.venv/bin/activate
-python3 exp4.py {exp} {method}
+python3 sweep.py --seeds {seeds} --processes 76 --event-driven --output exp{exp}-results.csv
 
 """
 
-for i in range(4):
-    job_script = TEMPLATE.format(method=i, exp=exp)
-    file = f"exp{exp}-{i}.sh"
-    with open(file, "w") as f:
-        f.write(job_script)
-    subprocess.run(["qsub", file])
-    os.remove(file)
\ No newline at end of file
+job_script = TEMPLATE.format(seeds=seeds, exp=exp)
+file = f"exp{exp}.sh"
+with open(file, "w") as f:
+    f.write(job_script)
+subprocess.run(["qsub", file])
+os.remove(file)
\ No newline at end of file
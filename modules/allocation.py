@@ -0,0 +1,103 @@
+from typing import List
+import numpy as np
+from modules.resource_map import ResourceMap
+
+
+class AllocationStrategy:
+    """ジョブに割り当てるノードの選び方
+
+    リソースマップの free_run_lengths（各ノードが開始タイムステップから連続して空いている長さ）
+    から、[start, start + length) の間空いているノードを node_size 個選ぶ。
+    """
+
+    # Trueの場合、空いている長さは length で打ち切ってよい
+    bounded = True
+
+    def __init__(self, node_size: int, rack_size: int):
+        self.node_size = node_size
+        self.rack_size = rack_size
+
+    def select_nodes(
+        self, resource_map: ResourceMap, node_size: int, start: int, length: int
+    ) -> List[int]:
+        free_run_lengths = resource_map.free_run_lengths(
+            start, length if self.bounded else None
+        )
+        return self.select(free_run_lengths, node_size, length)
+
+    def select(
+        self, free_run_lengths: np.ndarray, node_size: int, length: int
+    ) -> List[int]:
+        raise NotImplementedError
+
+
+class FirstFitAllocation(AllocationStrategy):
+    """インデックスの小さい順に選ぶ"""
+
+    def select(self, free_run_lengths, node_size, length):
+        return first_fit(free_run_lengths >= length, node_size)
+
+
+class BestFitAllocation(AllocationStrategy):
+    """ジョブの終了後に空いたまま残る長さが短いノードから選ぶ（空き時間の断片化を減らす）"""
+
+    bounded = False
+
+    def select(self, free_run_lengths, node_size, length):
+        free_nodes = np.flatnonzero(free_run_lengths >= length)
+        order = np.argsort(free_run_lengths[free_nodes], kind="stable")
+        return free_nodes[order][: max(node_size, 1)].tolist()
+
+
+class ContiguousAllocation(AllocationStrategy):
+    """インデックスが連続した node_size 個のノードのうち最初のものを選ぶ
+
+    連続したノードが空いていない場合はインデックスの小さい順に選ぶ。
+    """
+
+    def select(self, free_run_lengths, node_size, length):
+        free = free_run_lengths >= length
+        block_size = max(node_size, 1)
+        if block_size <= len(free):
+            # 各ノードから始まる block_size 個のうち空いているノード数
+            free_counts = np.convolve(free, np.ones(block_size, dtype=int), "valid")
+            blocks = np.flatnonzero(free_counts == block_size)
+            if len(blocks) > 0:
+                return list(range(int(blocks[0]), int(blocks[0]) + block_size))
+        return first_fit(free, node_size)
+
+
+class TopologyAwareAllocation(AllocationStrategy):
+    """rack_size 個ずつのノードをラック（スイッチ）とみなし、使うラックの数を減らすように選ぶ
+
+    1つのラックに収まる場合は、収まるラックのうち空いているノードが最も少ないラックを選ぶ。
+    収まらない場合は空いているノードが多いラックから順に使う。
+    """
+
+    def select(self, free_run_lengths, node_size, length):
+        free_nodes = np.flatnonzero(free_run_lengths >= length)
+        racks = free_nodes // self.rack_size
+        free_counts = np.bincount(racks, minlength=-(-self.node_size // self.rack_size))
+        block_size = max(node_size, 1)
+        fitting_racks = np.flatnonzero(free_counts >= block_size)
+        if len(fitting_racks) > 0:
+            rack = fitting_racks[np.argmin(free_counts[fitting_racks])]
+            return free_nodes[racks == rack][:block_size].tolist()
+        # ラックの順に並べ替えて先頭から選ぶ
+        rack_order = np.argsort(-free_counts, kind="stable")
+        rank = np.empty_like(rack_order)
+        rank[rack_order] = np.arange(len(rack_order))
+        order = np.argsort(rank[racks], kind="stable")
+        return sorted(free_nodes[order][:block_size].tolist())
+
+
+def first_fit(free: np.ndarray, node_size: int) -> List[int]:
+    return np.flatnonzero(free)[: max(node_size, 1)].tolist()
+
+
+ALLOCATION_STRATEGIES = {
+    "first_fit": FirstFitAllocation,
+    "best_fit": BestFitAllocation,
+    "contiguous": ContiguousAllocation,
+    "topology": TopologyAwareAllocation,
+}
@@ -0,0 +1,221 @@
+from bisect import bisect_left, bisect_right
+from typing import Dict, List, Set
+import numpy as np
+from modules.resource_map import ResourceMap
+
+
+class AvailabilityProfile(ResourceMap):
+    """空きノード数の階段関数とノードごとの予約区間でジョブの予約を管理する
+
+    times[i] から times[i + 1] までの空きノード数が free_counts[i]。
+    times にはいずれかのノードの予約が始まる・終わるタイムステップがすべて含まれ、
+    空き状態はこれらのタイムステップでしか変わらないので、
+    割り当て可否はこれらのタイムステップだけを調べればよい。
+    """
+
+    def __init__(self, node_size: int, timestep_window: int):
+        super().__init__(node_size, timestep_window)
+        self._clear()
+
+    def _clear(self):
+        self.times = [0]
+        self.free_counts = [self.node_size]
+        # タイムステップごとの、そこで始まる・終わる予約区間の数
+        self.time_refs: Dict[int, int] = {}
+        # タイムステップごとの、そこで予約が始まるノード
+        self.start_nodes: Dict[int, Set[int]] = {}
+        # ノードごとの予約区間（開始の早い順）
+        self.node_starts: List[List[int]] = [[] for _ in range(self.node_size)]
+        self.node_ends: List[List[int]] = [[] for _ in range(self.node_size)]
+        self.node_jobs: List[List[int]] = [[] for _ in range(self.node_size)]
+
+    def __str__(self):
+        return str(self.to_array())
+
+    def to_array(self):
+        """ノード×タイムステップの行列に変換する"""
+        resource_map = np.full((self.node_size, self.timestep_window), -1)
+        for node_index in range(self.node_size):
+            for start, end, job_index in zip(
+                self.node_starts[node_index],
+                self.node_ends[node_index],
+                self.node_jobs[node_index],
+            ):
+                resource_map[node_index, start:end] = job_index
+        return resource_map
+
+    def reserve(self, job_index, node_indecies, start, end):
+        if start >= end or len(node_indecies) == 0:
+            return
+        self.version += 1
+        self._add_time_ref(start, len(node_indecies))
+        self._add_time_ref(end, len(node_indecies))
+        for i in range(self._time_index(start), self._time_index(end)):
+            self.free_counts[i] -= len(node_indecies)
+        self.start_nodes.setdefault(start, set()).update(node_indecies)
+        for node_index in node_indecies:
+            i = bisect_left(self.node_starts[node_index], start)
+            self.node_starts[node_index].insert(i, start)
+            self.node_ends[node_index].insert(i, end)
+            self.node_jobs[node_index].insert(i, job_index)
+
+    def release(self, node_indecies, start, end):
+        self.version += 1
+        for node_index in node_indecies:
+            starts = self.node_starts[node_index]
+            ends = self.node_ends[node_index]
+            i = max(bisect_right(starts, start) - 1, 0)
+            while i < len(starts) and starts[i] < end:
+                if ends[i] <= start:
+                    i += 1
+                    continue
+                # 区間を削除し、解放範囲の外側の部分を予約し直す
+                interval_start, interval_end = starts[i], ends[i]
+                job_index = self.node_jobs[node_index][i]
+                self._remove_interval(node_index, i)
+                if interval_start < start:
+                    self.reserve(job_index, [node_index], interval_start, start)
+                    i += 1
+                if end < interval_end:
+                    self.reserve(job_index, [node_index], end, interval_end)
+                    i += 1
+
+    def is_free(self, node_indecies, timestep):
+        return all(
+            self._is_node_free(node_index, timestep) for node_index in node_indecies
+        )
+
+    def free_nodes(self, timestep):
+        return np.array(
+            [
+                self._is_node_free(node_index, timestep)
+                for node_index in range(self.node_size)
+            ]
+        )
+
+    def head_jobs(self):
+        return np.array(
+            [
+                jobs[0] if starts and starts[0] == 0 else -1
+                for starts, jobs in zip(self.node_starts, self.node_jobs)
+            ]
+        )
+
+    def candidate_start_times(self, node_size, length, last_start):
+        return self.times[: bisect_right(self.times, last_start)]
+
+    def can_fit(self, node_size, start, length):
+        if self.free_counts[self._time_index(start)] < node_size:
+            return False
+        return self._free_length(start, length) >= length
+
+    def free_run_lengths(self, start, limit):
+        infinity = np.iinfo(np.int32).max
+        free_run_lengths = np.empty(self.node_size, dtype=np.int64)
+        for node_index, (starts, ends) in enumerate(
+            zip(self.node_starts, self.node_ends)
+        ):
+            i = bisect_right(starts, start)
+            if i > 0 and ends[i - 1] > start:
+                free_run_lengths[node_index] = 0
+            elif i < len(starts):
+                free_run_lengths[node_index] = starts[i] - start
+            else:
+                free_run_lengths[node_index] = infinity
+        return free_run_lengths
+
+    def shift(self, timesteps):
+        intervals = [
+            (node_index, start, end, job_index)
+            for node_index in range(self.node_size)
+            for start, end, job_index in zip(
+                self.node_starts[node_index],
+                self.node_ends[node_index],
+                self.node_jobs[node_index],
+            )
+        ]
+        self._clear()
+        for node_index, start, end, job_index in intervals:
+            # 先頭列（実行中のジョブ）はそのまま、それ以降をずらす
+            if start == 0:
+                self.reserve(job_index, [node_index], 0, max(end - timesteps, 1))
+            else:
+                self.reserve(
+                    job_index, [node_index], max(start - timesteps, 1), end - timesteps
+                )
+
+    def column_capacity(self):
+        available_counts = np.empty(self.timestep_window, dtype=int)
+        free_lengths = np.empty(self.timestep_window, dtype=np.int64)
+        infinity = np.iinfo(np.int32).max
+        for i, start in enumerate(self.times):
+            if start >= self.timestep_window:
+                break
+            end = self.times[i + 1] if i + 1 < len(self.times) else self.timestep_window
+            end = min(end, self.timestep_window)
+            available_counts[start:end] = self.free_counts[i]
+            # 区間内では空いているノードの集合が変わらないので、次にビジーになる列も変わらない
+            next_busy = start + self._free_length(start, infinity)
+            if next_busy >= infinity:
+                next_busy = infinity
+            free_lengths[start:end] = next_busy - np.arange(start, end)
+        return available_counts, free_lengths
+
+    def busy_columns(self, node_indecies):
+        busy = np.zeros(self.timestep_window, dtype=bool)
+        for node_index in node_indecies:
+            for start, end in zip(
+                self.node_starts[node_index], self.node_ends[node_index]
+            ):
+                busy[start:end] = True
+        return busy
+
+    def _time_index(self, timestep):
+        """timestep を含む区間のインデックス"""
+        return bisect_right(self.times, timestep) - 1
+
+    def _add_time_ref(self, timestep, count):
+        i = bisect_left(self.times, timestep)
+        if i == len(self.times) or self.times[i] != timestep:
+            self.times.insert(i, timestep)
+            self.free_counts.insert(i, self.free_counts[i - 1])
+        self.time_refs[timestep] = self.time_refs.get(timestep, 0) + count
+
+    def _remove_time_ref(self, timestep, count):
+        self.time_refs[timestep] -= count
+        if self.time_refs[timestep] == 0:
+            del self.time_refs[timestep]
+            if timestep != 0:
+                # 前後の区間の空きノード数は等しいので結合する
+                i = bisect_left(self.times, timestep)
+                del self.times[i]
+                del self.free_counts[i]
+
+    def _remove_interval(self, node_index, i):
+        start = self.node_starts[node_index].pop(i)
+        end = self.node_ends[node_index].pop(i)
+        self.node_jobs[node_index].pop(i)
+        for j in range(self._time_index(start), self._time_index(end)):
+            self.free_counts[j] += 1
+        self._remove_time_ref(start, 1)
+        self._remove_time_ref(end, 1)
+        self.start_nodes[start].discard(node_index)
+        if not self.start_nodes[start]:
+            del self.start_nodes[start]
+
+    def _is_node_free(self, node_index, timestep):
+        i = bisect_right(self.node_starts[node_index], timestep) - 1
+        return i < 0 or self.node_ends[node_index][i] <= timestep
+
+    def _free_length(self, timestep, limit):
+        """timestep で空いているノードが連続して空いている長さの最小値（limit で打ち切り）
+
+        timestep で空いているノードがビジーになるのは、そのノードの予約が始まるときだけ。
+        """
+        i = bisect_right(self.times, timestep)
+        while i < len(self.times) and self.times[i] < timestep + limit:
+            for node_index in self.start_nodes.get(self.times[i], ()):
+                if self._is_node_free(node_index, timestep):
+                    return self.times[i] - timestep
+            i += 1
+        return limit
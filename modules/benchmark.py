@@ -0,0 +1,230 @@
+import contextlib
+import copy
+import io
+import os
+import tempfile
+import time
+from typing import List
+import numpy as np
+import pandas as pd
+from modules.simulator import Simulator
+
+BENCHMARKS = ["find_earliest_start_time", "backfill", "proceed_timestep", "run"]
+
+
+def generate_workload(
+    job_count: int,
+    node_size: int,
+    timestep_window: int,
+    timestep_seconds: int,
+    node_size_exponent: float = 2.0,
+    median_runtime: float = 3600,
+    runtime_sigma: float = 1.5,
+    prediction_bias: float = 0.0,
+    prediction_sigma: float = 0.6,
+    seed: int = 0,
+) -> pd.DataFrame:
+    """main.py などが読み込むデータと同じ列を持つ合成ワークロードを生成する
+
+    ノード数はべき分布（小さいジョブほど多い）、実行時間は対数正規分布、
+    予測実行時間は実行時間に対数正規分布の誤差を掛けたもの。
+    すべてのジョブがリソースに割り当て可能になるように、ノード数は node_size 未満、
+    予測実行時間は timestep_window * timestep_seconds 未満に収める。
+    """
+    rng = np.random.default_rng(seed)
+    max_time = timestep_window * timestep_seconds - 1
+    ehost_num = np.minimum(rng.zipf(node_size_exponent, job_count), node_size - 1)
+    y_true = np.clip(
+        rng.lognormal(np.log(median_runtime), runtime_sigma, job_count), 1, max_time
+    ).astype(int)
+    y_pred = np.clip(
+        y_true * rng.lognormal(prediction_bias, prediction_sigma, job_count),
+        1,
+        max_time,
+    )
+    return pd.DataFrame(
+        {
+            "log_id": np.arange(job_count),
+            "y_true": y_true,
+            "y_pred": y_pred,
+            "ehost_num": ehost_num,
+        }
+    )
+
+
+def prepare_simulator(
+    data: pd.DataFrame,
+    node_size: int,
+    timestep_window: int,
+    backfill_timestep_window: int,
+    watch_job_size: int,
+    timestep_seconds: int,
+    warmup_timesteps: int,
+    **simulator_options,
+) -> Simulator:
+    """初期スケジュールを作り、warmup_timesteps だけ進めてリソースマップを埋めた状態にする"""
+    simulator = Simulator(
+        data,
+        node_size,
+        timestep_window,
+        backfill_timestep_window,
+        watch_job_size,
+        timestep_seconds,
+        **simulator_options,
+    )
+    schedule = simulator.schedule
+    schedule.create_initial_schedule(
+        simulator.job_queue, simulator.resource, simulator.workload.jobs
+    )
+    for _ in range(warmup_timesteps):
+        schedule.proceed_timestep(
+            simulator.job_queue, simulator.resource, simulator.workload.jobs
+        )
+    return simulator
+
+
+def time_find_earliest_start_time(simulator: Simulator, repeat: int) -> List[float]:
+    """見えているジョブすべてについて _find_earliest_start_time を呼ぶ時間"""
+    jobs = simulator.job_queue.peek(simulator.WATCH_JOB_SIZE)
+    seconds = []
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        for job in jobs:
+            simulator.schedule._find_earliest_start_time(job)
+        seconds.append(time.perf_counter() - start_time)
+    return seconds
+
+
+def time_backfill(simulator: Simulator, repeat: int) -> List[float]:
+    """_backfill 1回の時間（毎回同じ状態のコピーから実行する）"""
+    seconds = []
+    for _ in range(repeat):
+        copied = copy.deepcopy(simulator)
+        start_time = time.perf_counter()
+        copied.schedule._backfill(copied.job_queue, copied.resource)
+        seconds.append(time.perf_counter() - start_time)
+    return seconds
+
+
+def time_proceed_timestep(simulator: Simulator, repeat: int) -> List[float]:
+    """同じ状態のコピーから proceed_timestep を repeat 回続けて呼んだときの各回の時間"""
+    copied = copy.deepcopy(simulator)
+    seconds = []
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        copied.schedule.proceed_timestep(
+            copied.job_queue, copied.resource, copied.workload.jobs
+        )
+        seconds.append(time.perf_counter() - start_time)
+    return seconds
+
+
+def time_run(
+    data: pd.DataFrame,
+    node_size: int,
+    timestep_window: int,
+    backfill_timestep_window: int,
+    watch_job_size: int,
+    timestep_seconds: int,
+    repeat: int,
+    **simulator_options,
+) -> List[float]:
+    """Simulator.run 全体の時間（統計の表示と進捗ファイルは捨てる）"""
+    seconds = []
+    with tempfile.TemporaryDirectory() as progress_dir:
+        progress_path = os.path.join(progress_dir, "exp-benchmark-method0-progress.txt")
+        for _ in range(repeat):
+            simulator = Simulator(
+                data,
+                node_size,
+                timestep_window,
+                backfill_timestep_window,
+                watch_job_size,
+                timestep_seconds,
+                **simulator_options,
+            )
+            start_time = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                simulator.run("-benchmark", 0, progress_path=progress_path)
+            seconds.append(time.perf_counter() - start_time)
+    return seconds
+
+
+def run_benchmarks(
+    points: List[tuple],
+    job_count: int,
+    run_job_count: int,
+    timestep_seconds: int = 60,
+    warmup_timesteps: int = 10,
+    repeat: int = 5,
+    seed: int = 0,
+    benchmarks: List[str] = BENCHMARKS,
+    workload_options: dict | None = None,
+    **simulator_options,
+) -> List[dict]:
+    """(node_size, timestep_window, backfill_timestep_window, watch_job_size) の各点で計測する
+
+    workload_options は generate_workload に渡す分布のパラメータ。
+    結果は計測ごとの辞書のリストで、JSONにそのまま書き出せる。
+    """
+    workload_options = workload_options or {}
+    results = []
+    for node_size, timestep_window, backfill_timestep_window, watch_job_size in points:
+        params = {
+            "node_size": node_size,
+            "timestep_window": timestep_window,
+            "backfill_timestep_window": backfill_timestep_window,
+            "watch_job_size": watch_job_size,
+            "timestep_seconds": timestep_seconds,
+        }
+        data = generate_workload(
+            job_count,
+            node_size,
+            timestep_window,
+            timestep_seconds,
+            seed=seed,
+            **workload_options,
+        )
+        simulator = prepare_simulator(
+            data,
+            node_size,
+            timestep_window,
+            backfill_timestep_window,
+            watch_job_size,
+            timestep_seconds,
+            warmup_timesteps,
+            **simulator_options,
+        )
+        for benchmark in benchmarks:
+            if benchmark == "find_earliest_start_time":
+                seconds = time_find_earliest_start_time(simulator, repeat)
+            elif benchmark == "backfill":
+                seconds = time_backfill(simulator, repeat)
+            elif benchmark == "proceed_timestep":
+                seconds = time_proceed_timestep(simulator, repeat)
+            elif benchmark == "run":
+                seconds = time_run(
+                    data.iloc[:run_job_count],
+                    node_size,
+                    timestep_window,
+                    backfill_timestep_window,
+                    watch_job_size,
+                    timestep_seconds,
+                    repeat=1,
+                    **simulator_options,
+                )
+            else:
+                raise ValueError(f"Unknown benchmark: {benchmark}")
+            results.append(
+                {
+                    "benchmark": benchmark,
+                    **params,
+                    "job_count": run_job_count if benchmark == "run" else job_count,
+                    "workload_options": workload_options,
+                    "options": simulator_options,
+                    "seconds": seconds,
+                    "mean_seconds": float(np.mean(seconds)),
+                    "min_seconds": float(np.min(seconds)),
+                }
+            )
+    return results
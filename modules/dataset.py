@@ -0,0 +1,235 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from typing import Dict, Iterator, List
+import numpy as np
+import pandas as pd
+
+DATA_LIST = [
+    {
+        "name": "jobs-proposed-method",
+        "path": "data/jobs-proposed-method.parquet",
+    },
+    {
+        "name": "jobs-previous-method",
+        "path": "data/jobs-previous-method.parquet",
+    },
+    {
+        "name": "jobs-last2",
+        "path": "data/jobs-last2.parquet",
+    },
+    {
+        "name": "jobs-user-estimation",
+        "path": "data/jobs-user-estimation.parquet",
+    },
+]
+
+COLUMNS = ["log_id", "y_true", "y_pred", "ehost_num"]
+
+CACHE_DIR = "data/cache"
+
+# キャッシュの形式を変えたときに増やす
+CACHE_VERSION = 1
+
+
+def load_datasets(data_list=DATA_LIST) -> List[pd.DataFrame]:
+    return [pd.read_parquet(data["path"], columns=COLUMNS) for data in data_list]
+
+
+def prepare_jobs(df_list: List[pd.DataFrame]) -> Dict[str, np.ndarray]:
+    """すべての手法に共通するジョブを結合し、手法×ジョブの配列にする
+
+    ジョブの順序は exp3.py / exp4.py と同じく最初のデータセットの順序。
+    """
+    common_jobs = (
+        df_list[0][COLUMNS].add_suffix("_0").rename(columns={"log_id_0": "log_id"})
+    )
+    for i, df in enumerate(df_list[1:], start=1):
+        common_jobs = pd.merge(
+            common_jobs,
+            df[COLUMNS].add_suffix(f"_{i}").rename(columns={f"log_id_{i}": "log_id"}),
+            on="log_id",
+            how="inner",
+        )
+    methods = range(len(df_list))
+    return {
+        "log_id": common_jobs["log_id"].to_numpy(),
+        **{
+            column: np.stack([common_jobs[f"{column}_{i}"].to_numpy() for i in methods])
+            for column in COLUMNS[1:]
+        },
+    }
+
+
+def sample_jobs(
+    arrays: Dict[str, np.ndarray],
+    node_size: int,
+    timestep_window: int,
+    timestep_seconds: int,
+    sample_size: int,
+    seed: int,
+) -> Dict[str, np.ndarray]:
+    """リソースに割り当て可能なジョブから sample_size 個をサンプリングする
+
+    DataFrame.sample(sample_size, random_state=seed) と同じジョブを同じ順序で選ぶ。
+    """
+    # リソースに割り当て可能なジョブに絞り込み
+    assignable = np.flatnonzero(
+        (arrays["y_pred"].max(axis=0) < timestep_window * timestep_seconds)
+        & (arrays["ehost_num"][0] < node_size)
+    )
+    sampled = assignable[
+        np.random.RandomState(seed).choice(len(assignable), sample_size, replace=False)
+    ]
+    return {
+        "log_id": arrays["log_id"][sampled],
+        **{column: arrays[column][:, sampled] for column in COLUMNS[1:]},
+    }
+
+
+def select_jobs(
+    arrays: Dict[str, np.ndarray],
+    method: int,
+    node_size: int,
+    timestep_window: int,
+    timestep_seconds: int,
+    sample_size: int,
+    seed: int,
+) -> pd.DataFrame:
+    """sample_jobs で選んだジョブのうち、指定した手法のデータを DataFrame にする"""
+    sampled = sample_jobs(
+        arrays, node_size, timestep_window, timestep_seconds, sample_size, seed
+    )
+    return to_dataframe(sampled, method)
+
+
+def to_dataframe(arrays: Dict[str, np.ndarray], method: int) -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "log_id": arrays["log_id"],
+            **{column: arrays[column][method] for column in COLUMNS[1:]},
+        }
+    )
+
+
+def add_poisson_arrivals(
+    data: pd.DataFrame, mean_interval_seconds: float, seed: int = 0
+) -> pd.DataFrame:
+    """ジョブがデータの順にポアソン過程で投入されるとして submit_time 列（秒）を加える"""
+    rng = np.random.default_rng(seed)
+    intervals = rng.exponential(mean_interval_seconds, len(data))
+    return data.assign(submit_time=np.cumsum(intervals))
+
+
+def read_parquet_batches(
+    path: str, columns=COLUMNS, batch_size: int = 65536
+) -> Iterator[pd.DataFrame]:
+    """parquet ファイルを batch_size 行ずつ読み込む
+
+    行グループの大きさによらず、メモリに載るのは batch_size 行だけ。
+    """
+    import pyarrow.parquet as pq
+
+    parquet_file = pq.ParquetFile(path)
+    for batch in parquet_file.iter_batches(batch_size=batch_size, columns=columns):
+        yield batch.to_pandas()
+
+
+def parquet_row_count(path: str) -> int:
+    """メタデータだけを読んで parquet ファイルの行数を返す"""
+    import pyarrow.parquet as pq
+
+    return pq.ParquetFile(path).metadata.num_rows
+
+
+def file_signature(path: str) -> list:
+    """入力ファイルのパス・サイズ・更新時刻（内容は読まずに stat だけで求める）"""
+    stat = os.stat(path)
+    return [os.path.abspath(path), stat.st_size, stat.st_mtime_ns]
+
+
+def cache_key(data_list=DATA_LIST, **params) -> str:
+    """パラメータと入力ファイルのパス・サイズ・更新時刻からキャッシュのキーを作る"""
+    key = {
+        "version": CACHE_VERSION,
+        "files": [file_signature(data["path"]) for data in data_list],
+        **params,
+    }
+    return hashlib.sha256(json.dumps(key, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def _load_cache(directory: str) -> Dict[str, np.ndarray] | None:
+    if not os.path.isdir(directory):
+        return None
+    # 読み込み専用でメモリマップするので、ワーカーが増えてもページキャッシュを共有できる
+    return {
+        column: np.load(os.path.join(directory, f"{column}.npy"), mmap_mode="r")
+        for column in COLUMNS
+    }
+
+
+def _save_cache(directory: str, arrays: Dict[str, np.ndarray]):
+    parent = os.path.dirname(directory)
+    os.makedirs(parent, exist_ok=True)
+    # 別のプロセスが同時に作っても壊れないように、一時ディレクトリに書いてから名前を変える
+    temporary = tempfile.mkdtemp(dir=parent)
+    try:
+        for column in COLUMNS:
+            np.save(os.path.join(temporary, f"{column}.npy"), arrays[column])
+        os.rename(temporary, directory)
+    except OSError:
+        shutil.rmtree(temporary, ignore_errors=True)
+        if not os.path.isdir(directory):
+            raise
+
+
+def load_common_jobs(data_list=DATA_LIST, cache_dir=CACHE_DIR) -> Dict[str, np.ndarray]:
+    """prepare_jobs の結果をキャッシュから読み込む（なければ作って保存する）"""
+    directory = os.path.join(cache_dir, f"common-{cache_key(data_list)}")
+    arrays = _load_cache(directory)
+    if arrays is None:
+        _save_cache(directory, prepare_jobs(load_datasets(data_list)))
+        arrays = _load_cache(directory)
+    return arrays
+
+
+def load_sampled_jobs(
+    node_size: int,
+    timestep_window: int,
+    timestep_seconds: int,
+    sample_size: int,
+    seed: int,
+    data_list=DATA_LIST,
+    cache_dir=CACHE_DIR,
+) -> List[pd.DataFrame]:
+    """共通・絞り込み・サンプリング済みのジョブを手法ごとの DataFrame で返す
+
+    結果は (node_size, ウィンドウ, sample_size, seed) と入力ファイルのサイズ・更新時刻をキーに
+    cache_dir に .npy で保存し、2回目以降はそれをメモリマップで読み込む。
+    """
+    params = {
+        "node_size": node_size,
+        "timestep_window": timestep_window,
+        "timestep_seconds": timestep_seconds,
+        "sample_size": sample_size,
+        "seed": seed,
+    }
+    directory = os.path.join(cache_dir, f"sampled-{cache_key(data_list, **params)}")
+    arrays = _load_cache(directory)
+    if arrays is None:
+        common_jobs = load_common_jobs(data_list, cache_dir)
+        _save_cache(
+            directory,
+            sample_jobs(
+                common_jobs,
+                node_size,
+                timestep_window,
+                timestep_seconds,
+                sample_size,
+                seed,
+            ),
+        )
+        arrays = _load_cache(directory)
+    return [to_dataframe(arrays, method) for method in range(len(data_list))]
@@ -0,0 +1,62 @@
+from typing import Callable, Optional
+import numpy as np
+
+NOT_FOUND = np.iinfo(np.int32).max
+
+
+class FeasibilityCache:
+    """ジョブの形 (node_size, timestep_length) ごとの探索結果を、リソースマップのバージョンが変わるまで覚える
+
+    探索の種類 (kind) と形ごとに、最初に割り当て可能な開始タイムステップ（なければ None）を持つ。
+    node_size も timestep_length も小さくない形は、小さい形が割り当てられないタイムステップには
+    割り当てられないので、記録済みの形の結果はそれより大きい形の開始タイムステップの下限になる。
+    """
+
+    def __init__(self):
+        self.version = None
+        self.results = {}
+        self.hits = 0
+        self.pruned = 0
+        self.misses = 0
+
+    def search(
+        self,
+        kind: str,
+        node_size: int,
+        length: int,
+        last_start: int,
+        version: int,
+        find: Callable[[int], Optional[int]],
+    ) -> Optional[int]:
+        """[0, last_start] で最初に割り当て可能な開始タイムステップを返す
+
+        find(lower_bound) は lower_bound 以降で最初に割り当て可能な開始タイムステップを探す。
+        """
+        if version != self.version:
+            self.results = {}
+            self.version = version
+        key = (kind, node_size, length)
+        if key in self.results:
+            self.hits += 1
+            return self.results[key]
+        lower_bound = self.lower_bound(kind, node_size, length)
+        if lower_bound > last_start:
+            self.pruned += 1
+            start = None
+        else:
+            self.misses += 1
+            start = find(lower_bound)
+        self.results[key] = start
+        return start
+
+    def lower_bound(self, kind: str, node_size: int, length: int) -> int:
+        """記録済みの、node_size と length がどちらも以下の形の結果の最大値"""
+        lower_bound = 0
+        for (other_kind, other_node_size, other_length), start in self.results.items():
+            if (
+                other_kind == kind
+                and other_node_size <= node_size
+                and other_length <= length
+            ):
+                lower_bound = max(lower_bound, NOT_FOUND if start is None else start)
+        return lower_bound
@@ -1,6 +1,7 @@
 import pandas as pd
 import numpy as np
-from typing import List
+import weakref
+from typing import Iterable, List
 
 
 class Workload:
@@ -16,15 +17,21 @@ class Workload:
         for job in self.jobs:
             print(job)
 
-    def from_dataframe(self, data, timestep_seconds) -> List["Job"]:
+    def from_dataframe(self, data, timestep_seconds, start_index=0) -> List["Job"]:
         jobs = []
-        for idx, (index, row) in enumerate(data.iterrows()):
+        for idx, (index, row) in enumerate(data.iterrows(), start=start_index):
             log_id = row["log_id"]
             real_time = int(row["y_true"])  # Ensure real_time is an integer
             pred_time = int(
                 round(row["y_pred"])
             )  # Round and ensure pred_time is an integer
             node_size = int(row["ehost_num"])
+            # 投入時刻（秒）がある場合は、それ以降の最初のタイムステップに投入する
+            submit_timestep = (
+                int(np.ceil(row["submit_time"] / timestep_seconds))
+                if "submit_time" in row.index
+                else None
+            )
             jobs.append(
                 Job(
                     job_index=idx,
@@ -33,6 +40,7 @@ class Workload:
                     real_time=real_time,
                     node_size=node_size,
                     timestep_length=np.ceil(pred_time / timestep_seconds).astype(int),
+                    submit_timestep=submit_timestep,
                 )
             )
         return jobs
@@ -55,6 +63,119 @@ class Workload:
         backfill_jobs = [job for job in self.jobs if job.is_backfilled]
         return len(backfill_jobs) / len(self.jobs)
 
+    def get_avg_wait_time(self):
+        """投入から開始までの平均待ち時間（秒）"""
+        waits = [
+            job.start_timestep - job.submit_timestep
+            for job in self.jobs
+            if job.start_timestep is not None and job.submit_timestep is not None
+        ]
+        return np.mean(waits) * self.timestep_seconds
+
+    def __len__(self):
+        return len(self.jobs)
+
+
+class StreamingWorkload(Workload):
+    """DataFrameのチャンク（parquetの行グループなど）から必要になった分だけジョブを作るワークロード
+
+    jobs はキュー・スケジュール・実行中のジョブ (job_index -> Job) だけを持ち、
+    完了したジョブは complete_jobs で統計に加えて writer に書き出したあと捨てる。
+    チャンクは DataFrame のまま持ち、Job は read_jobs で要求された行の分だけ作るので、
+    使うメモリは読み込み中のチャンクと見えているジョブの数で決まる。
+    """
+
+    def __init__(
+        self,
+        chunks: Iterable[pd.DataFrame],
+        timestep_seconds: int,
+        writer=None,
+        total_jobs: int | None = None,
+    ):
+        self.timestep_seconds = timestep_seconds
+        self.chunks = iter(chunks)
+        self.writer = writer
+        # 全体のジョブ数（分かっている場合のみ。進捗の表示に使う）
+        self.total_jobs = total_jobs
+        self.jobs = {}
+        # 読み込み中のチャンクと、その中でまだ Job にしていない最初の行
+        self.chunk = None
+        self.chunk_position = 0
+        self.loaded_job_count = 0
+        self.completed_job_count = 0
+        self.backfilled_job_count = 0
+        self.fcfs_job_count = 0
+        self.fcfs_wait_timesteps = 0
+        self.submitted_job_count = 0
+        self.submit_wait_timesteps = 0
+
+    def read_jobs(self, n: int) -> List["Job"]:
+        """次の最大n個のジョブを返す"""
+        jobs = []
+        while len(jobs) < n:
+            if self.chunk is None or self.chunk_position >= len(self.chunk):
+                self.chunk = next(self.chunks, None)
+                self.chunk_position = 0
+                if self.chunk is None:
+                    break
+                continue
+            rows = self.chunk.iloc[
+                self.chunk_position : self.chunk_position + n - len(jobs)
+            ]
+            jobs.extend(
+                self.from_dataframe(
+                    rows, self.timestep_seconds, start_index=self.loaded_job_count
+                )
+            )
+            self.chunk_position += len(rows)
+            self.loaded_job_count += len(rows)
+        for job in jobs:
+            self.jobs[job.job_index] = job
+        return jobs
+
+    def complete_jobs(self, completed_jobs: List["Job"]):
+        for job in completed_jobs:
+            self.completed_job_count += 1
+            if job.is_backfilled:
+                self.backfilled_job_count += 1
+            elif job.queued_timestep is not None and job.start_timestep is not None:
+                self.fcfs_job_count += 1
+                self.fcfs_wait_timesteps += job.start_timestep - job.queued_timestep
+            if job.submit_timestep is not None:
+                self.submitted_job_count += 1
+                self.submit_wait_timesteps += job.start_timestep - job.submit_timestep
+            del self.jobs[job.job_index]
+        if self.writer is not None and completed_jobs:
+            self.writer.write(completed_jobs)
+
+    def print_jobs(self):
+        print("*** Jobs ***")
+        print(
+            "job_index\tlog_id\tpred_time\treal_time\tnode_size\tqueued_timestep\tstart_timestep\tis_backfilled\tallocated_node_indecies\toccupied_range"
+        )
+        for job in self.jobs.values():
+            print(job)
+
+    def get_avg_wall_time(self):
+        if self.fcfs_job_count == 0:
+            return np.nan
+        return self.fcfs_wait_timesteps / self.fcfs_job_count * self.timestep_seconds
+
+    def get_backfill_ratio(self):
+        return self.backfilled_job_count / self.completed_job_count
+
+    def get_avg_wait_time(self):
+        if self.submitted_job_count == 0:
+            return np.nan
+        return (
+            self.submit_wait_timesteps
+            / self.submitted_job_count
+            * self.timestep_seconds
+        )
+
+    def __len__(self):
+        return self.loaded_job_count
+
 
 class Job:
     def __init__(
@@ -65,6 +186,7 @@ class Job:
         real_time: int,
         node_size: int,
         timestep_length: int,
+        submit_timestep: int | None = None,
     ):
         self.job_index = job_index
         self.log_id = log_id
@@ -78,6 +200,7 @@ class Job:
         self.allocated_node_indecies = []
         self.timestep_length = timestep_length
         self.occupied_range = [0, 0]
+        self.submit_timestep = submit_timestep
 
     def __repr__(self):
         return f"{self.job_index}\t{self.log_id}\t{self.pred_time}\t\t{self.real_time}\t\t{self.node_size}\t\t{self.queued_timestep}\t\t{self.start_timestep}\t\t{self.is_backfilled}\t\t{self.allocated_node_indecies}\t{self.occupied_range}"
@@ -85,3 +208,234 @@ class Job:
     def set_queued_timestep(self, timestep: int):
         if self.queued_timestep is None:
             self.queued_timestep = timestep
+
+
+class ArrayWorkload:
+    """ジョブの属性を列ごとのNumPy配列で持つワークロード
+
+    jobs[job_index] はスケジューラから参照されている間だけ存在する JobView を返す。
+    JobView の属性は配列を読み書きするので、完了したジョブの結果は配列にだけ残る。
+    キューに入ったタイムステップと開始タイムステップが未設定の場合は-1。
+    """
+
+    def __init__(self, data: pd.DataFrame, timestep_seconds: int):
+        self.timestep_seconds = timestep_seconds
+        self.log_id = data["log_id"].to_numpy()
+        self.real_time = data["y_true"].to_numpy().astype(int)
+        self.pred_time = np.rint(data["y_pred"].to_numpy()).astype(int)
+        self.node_size = data["ehost_num"].to_numpy().astype(int)
+        self.timestep_length = np.ceil(self.pred_time / timestep_seconds).astype(int)
+        self.queued_timestep = np.full(len(data), -1)
+        self.start_timestep = np.full(len(data), -1)
+        self.is_backfilled = np.zeros(len(data), dtype=bool)
+        # 割り当て先のノード（ジョブが完了した後も残す）。CSR 形式で、ジョブ i のノードは
+        # allocated_node_indecies[allocated_node_offsets[i]:allocated_node_offsets[i + 1]]。
+        # ジョブには max(node_size, 1) 個のノードを割り当てるので、その分の領域を確保しておく（未割り当ては-1）
+        self.allocated_node_offsets = np.concatenate(
+            ([0], np.cumsum(np.maximum(self.node_size, 1)))
+        )
+        self.allocated_node_indecies = np.full(
+            self.allocated_node_offsets[-1], -1, dtype=np.int32
+        )
+        # 投入時刻（秒）がある場合のみ
+        self.submit_timestep = (
+            np.ceil(data["submit_time"].to_numpy() / timestep_seconds).astype(int)
+            if "submit_time" in data.columns
+            else None
+        )
+        self.jobs = JobViews(self)
+
+    def print_jobs(self):
+        print("*** Jobs ***")
+        print(
+            "job_index\tlog_id\tpred_time\treal_time\tnode_size\tqueued_timestep\tstart_timestep\tis_backfilled\tallocated_node_indecies\toccupied_range"
+        )
+        for job in self.jobs:
+            print(job)
+
+    def job_node_indecies(self, job_index: int) -> np.ndarray:
+        """ジョブに割り当てたノード番号（allocated_node_indecies のビュー）"""
+        start = self.allocated_node_offsets[job_index]
+        node_indecies = self.allocated_node_indecies[
+            start : self.allocated_node_offsets[job_index + 1]
+        ]
+        if node_indecies[-1] == -1:
+            # 未割り当て（または必要な数のノードを割り当てられなかった）
+            node_indecies = node_indecies[: np.argmax(node_indecies == -1)]
+        return node_indecies
+
+    def set_job_node_indecies(self, job_index: int, node_indecies: List[int]):
+        start = self.allocated_node_offsets[job_index]
+        end = self.allocated_node_offsets[job_index + 1]
+        if len(node_indecies) > end - start:
+            raise ValueError(f"Job {job_index} is allocated too many nodes")
+        self.allocated_node_indecies[start:end] = -1
+        self.allocated_node_indecies[start : start + len(node_indecies)] = node_indecies
+
+    def get_avg_wall_time(self):
+        # is_backfilledでないかつqueued_timestepとstart_timestepが設定されているジョブのみを抽出
+        fcfs_jobs = (
+            ~self.is_backfilled
+            & (self.queued_timestep != -1)
+            & (self.start_timestep != -1)
+        )
+        fcfs_diff = self.start_timestep[fcfs_jobs] - self.queued_timestep[fcfs_jobs]
+        return np.mean(fcfs_diff) * self.timestep_seconds
+
+    def get_backfill_ratio(self):
+        return np.count_nonzero(self.is_backfilled) / len(self.is_backfilled)
+
+    def get_avg_wait_time(self):
+        """投入から開始までの平均待ち時間（秒）"""
+        started = self.start_timestep != -1
+        waits = self.start_timestep[started] - self.submit_timestep[started]
+        return np.mean(waits) * self.timestep_seconds
+
+    def __len__(self):
+        return len(self.log_id)
+
+
+class JobViews:
+    """ArrayWorkload のジョブを Job と同じインターフェースで参照するためのシーケンス
+
+    参照されている間は同じ JobView を返すので、ジョブの同一性で比較するコードもそのまま動く。
+    """
+
+    def __init__(self, workload: ArrayWorkload):
+        self.workload = workload
+        self.views: "weakref.WeakValueDictionary[int, JobView]" = (
+            weakref.WeakValueDictionary()
+        )
+
+    def __getstate__(self):
+        return {"workload": self.workload, "views": dict(self.views)}
+
+    def __setstate__(self, state):
+        self.workload = state["workload"]
+        self.views = weakref.WeakValueDictionary(state["views"])
+
+    def __len__(self):
+        return len(self.workload.log_id)
+
+    def __getitem__(self, job_index) -> "JobView":
+        job_index = int(job_index)
+        view = self.views.get(job_index)
+        if view is None:
+            view = JobView(self.workload, job_index)
+            self.views[job_index] = view
+        return view
+
+    def __iter__(self):
+        for job_index in range(len(self)):
+            yield self[job_index]
+
+
+class JobView:
+    """ArrayWorkload の1つのジョブ
+
+    スケジュール中にだけ使う割り当て先のノードと占有範囲はこのオブジェクトが持つ。
+    割り当て先のノード番号は ArrayWorkload の配列のビューを返す。
+    """
+
+    __slots__ = (
+        "workload",
+        "job_index",
+        "allocated_nodes",
+        "occupied_range",
+        "_allocated_node_indecies",
+        "__weakref__",
+    )
+
+    def __init__(self, workload: ArrayWorkload, job_index: int):
+        self.workload = workload
+        self.job_index = job_index
+        self.allocated_nodes = []
+        # 配列を書き換えるのはこのオブジェクトの setter だけなので、ビューを覚えておく
+        self._allocated_node_indecies = workload.job_node_indecies(job_index)
+        self.occupied_range = [0, 0]
+
+    def __getstate__(self):
+        return {
+            "workload": self.workload,
+            "job_index": self.job_index,
+            "allocated_nodes": self.allocated_nodes,
+            "occupied_range": self.occupied_range,
+        }
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
+        # 復元中は workload の配列がまだないことがあるので、最初に参照したときに作る
+        self._allocated_node_indecies = None
+
+    @property
+    def allocated_node_indecies(self) -> np.ndarray:
+        if self._allocated_node_indecies is None:
+            self._allocated_node_indecies = self.workload.job_node_indecies(
+                self.job_index
+            )
+        return self._allocated_node_indecies
+
+    @allocated_node_indecies.setter
+    def allocated_node_indecies(self, node_indecies: List[int]):
+        self.workload.set_job_node_indecies(self.job_index, node_indecies)
+        self._allocated_node_indecies = self.workload.job_node_indecies(self.job_index)
+
+    @property
+    def log_id(self):
+        return self.workload.log_id[self.job_index]
+
+    @property
+    def pred_time(self) -> int:
+        return int(self.workload.pred_time[self.job_index])
+
+    @property
+    def real_time(self) -> int:
+        return int(self.workload.real_time[self.job_index])
+
+    @property
+    def node_size(self) -> int:
+        return int(self.workload.node_size[self.job_index])
+
+    @property
+    def timestep_length(self) -> int:
+        return int(self.workload.timestep_length[self.job_index])
+
+    @property
+    def submit_timestep(self) -> int | None:
+        if self.workload.submit_timestep is None:
+            return None
+        return int(self.workload.submit_timestep[self.job_index])
+
+    @property
+    def queued_timestep(self) -> int | None:
+        timestep = int(self.workload.queued_timestep[self.job_index])
+        return None if timestep == -1 else timestep
+
+    @queued_timestep.setter
+    def queued_timestep(self, timestep: int | None):
+        self.workload.queued_timestep[self.job_index] = (
+            -1 if timestep is None else timestep
+        )
+
+    @property
+    def start_timestep(self) -> int | None:
+        timestep = int(self.workload.start_timestep[self.job_index])
+        return None if timestep == -1 else timestep
+
+    @start_timestep.setter
+    def start_timestep(self, timestep: int | None):
+        self.workload.start_timestep[self.job_index] = (
+            -1 if timestep is None else timestep
+        )
+
+    @property
+    def is_backfilled(self) -> bool:
+        return bool(self.workload.is_backfilled[self.job_index])
+
+    @is_backfilled.setter
+    def is_backfilled(self, is_backfilled: bool):
+        self.workload.is_backfilled[self.job_index] = is_backfilled
+
+    __repr__ = Job.__repr__
+    set_queued_timestep = Job.set_queued_timestep
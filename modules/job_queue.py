@@ -1,33 +1,104 @@
-from typing import List, Optional
-from collections import deque
+from typing import Callable, List, Optional
+from collections import OrderedDict, deque
+from itertools import islice
 from modules.job import Job
 
 
 class JobQueue:
-    def __init__(self, jobs: List[Job]):
-        self.queue = deque(jobs)
+    """ジョブのキュー
+
+    queueはjob_indexをキーとする順序付き辞書なので、先頭からn件の取得はO(n)、
+    任意のジョブの削除はO(1)で行える。
+    """
+
+    def __init__(
+        self,
+        jobs: List[Job],
+        source: Optional[Callable[[int], List[Job]]] = None,
+        buffer_size: int = 0,
+        arrival: bool = False,
+    ):
+        # arrival=Trueの場合、ジョブは投入タイムステップになるまでarrivalsで待つ
+        self.arrival = arrival
+        if arrival:
+            self.queue = OrderedDict()
+            self.arrivals = deque(sorted(jobs, key=lambda job: job.submit_timestep))
+        else:
+            self.queue = OrderedDict((job.job_index, job) for job in jobs)
+            self.arrivals = deque()
+        # sourceを指定すると、キューのジョブがbuffer_size未満になるたびにsourceから読み足す
+        # （arrival=Trueの場合はarrivalsが空になるたびに読み足すので、投入順に並んでいる必要がある）
+        self.source = source
+        self.buffer_size = buffer_size
+        self.last_submit_timestep = 0
+        self.refill()
+
+    def refill(self):
+        if self.source is None:
+            return
+        if self.arrival:
+            if not self.arrivals:
+                for job in self.source(self.buffer_size):
+                    # ストリーミングではチャンクを読むまで submit_time 列があるか分からない
+                    if job.submit_timestep is None:
+                        raise ValueError("arrival requires a submit_time column")
+                    if job.submit_timestep < self.last_submit_timestep:
+                        raise ValueError("Jobs must be sorted by submit time")
+                    self.last_submit_timestep = job.submit_timestep
+                    self.arrivals.append(job)
+        elif len(self.queue) < self.buffer_size:
+            for job in self.source(self.buffer_size - len(self.queue)):
+                self.enqueue(job)
+
+    def submit_arrived_jobs(self, timestep: int) -> int:
+        """投入タイムステップがtimestep以前のジョブをキューに入れ、その数を返す"""
+        submitted_job_count = 0
+        self.refill()
+        while self.arrivals and self.arrivals[0].submit_timestep <= timestep:
+            self.enqueue(self.arrivals.popleft())
+            submitted_job_count += 1
+            self.refill()
+        return submitted_job_count
+
+    def next_arrival_timestep(self) -> Optional[int]:
+        """次にジョブが投入されるタイムステップ（これ以上投入されない場合はNone）"""
+        self.refill()
+        return self.arrivals[0].submit_timestep if self.arrivals else None
 
     def print_queue(self):
         print("*** Job Queue ***")
         if not self.queue:
             print("Empty")
-        for job in self.queue:
+        for job in self.queue.values():
             print(job)
 
+    def __len__(self) -> int:
+        return len(self.queue)
+
     def enqueue(self, job: Job):
-        self.queue.append(job)
+        self.queue[job.job_index] = job
 
     def dequeue(self) -> Optional[Job]:
         if self.queue:
-            return self.queue.popleft()
+            return self.queue.popitem(last=False)[1]
         return None
 
+    def remove(self, job: Job):
+        del self.queue[job.job_index]
+
+    def head(self, n: int) -> List[Job]:
+        """先頭からn件のジョブを返す（sourceからは読み足さない）"""
+        return list(islice(self.queue.values(), n))
+
     def peek(self, n: int) -> List[Job]:
-        return list(self.queue)[:n]
+        self.refill()
+        return self.head(n)
 
     def is_empty(self) -> bool:
-        return len(self.queue) == 0
+        self.refill()
+        return len(self.queue) == 0 and len(self.arrivals) == 0
 
     def set_queued_timestep(self, timestep: int, watch_job_size: int):
-        for job in list(self.queue)[:watch_job_size]:
+        self.refill()
+        for job in self.head(watch_job_size):
             job.set_queued_timestep(timestep)
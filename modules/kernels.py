@@ -0,0 +1,73 @@
+import numpy as np
+
+# リソースマップの行列（空きは-1）を直接走査するカーネル
+# numba がある場合はコンパイルして DenseResourceMap（vectorized=False）で使う。
+# ない場合も同じ関数を Python のまま呼べるので、NumPy の実装との比較に使える。
+
+try:
+    import numba
+
+    NUMBA_AVAILABLE = True
+    jit = numba.njit(cache=True)
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+    def jit(function):
+        return function
+
+
+INFINITY = np.iinfo(np.int32).max
+
+
+@jit
+def can_fit(resource_map, node_size, start, length):
+    """start で空いているノードがすべて length の間空いていて、かつ node_size 以上あるか"""
+    node_count, timestep_window = resource_map.shape
+    end = min(start + length, timestep_window)
+    available_count = 0
+    for node_index in range(node_count):
+        if resource_map[node_index, start] == -1:
+            available_count += 1
+    if available_count < node_size:
+        return False
+    for node_index in range(node_count):
+        if resource_map[node_index, start] != -1:
+            continue
+        for t in range(start + 1, end):
+            if resource_map[node_index, t] != -1:
+                return False
+    return True
+
+
+@jit
+def find_earliest_start_time(resource_map, node_size, length, last_start, lower_bound):
+    """[lower_bound, last_start] の中で can_fit を満たす最初のタイムステップ（ない場合は-1）"""
+    for t in range(lower_bound, last_start + 1):
+        if can_fit(resource_map, node_size, t, length):
+            return t
+    return -1
+
+
+@jit
+def free_run_lengths(resource_map, start, limit):
+    """各ノードが start から連続して空いている長さ（limit < 0 の場合は打ち切らない）"""
+    node_count, timestep_window = resource_map.shape
+    end = timestep_window if limit < 0 else min(start + max(limit, 1), timestep_window)
+    lengths = np.full(node_count, INFINITY, dtype=np.int64)
+    for node_index in range(node_count):
+        for t in range(start, end):
+            if resource_map[node_index, t] != -1:
+                lengths[node_index] = t - start
+                break
+    return lengths
+
+
+@jit
+def compact_start(resource_map, node_indecies, start):
+    """指定したノードがすべて空いている間、start を前にずらした開始タイムステップ"""
+    while start > 0:
+        for node_index in node_indecies:
+            if resource_map[node_index, start - 1] != -1:
+                return start
+        start -= 1
+    return start
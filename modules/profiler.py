@@ -0,0 +1,194 @@
+import time
+from collections import defaultdict
+from functools import wraps
+from typing import Optional
+
+# 計測する Schedule のフェーズ
+SCHEDULE_PHASES = [
+    "_release_completed_jobs",
+    "_shrink_running_jobs",
+    "_compact_waiting_jobs",
+    "_advance_time_axis",
+    "_schedule_fcfs",
+    "_backfill",
+    "_allocate_resources",
+    "skip_idle_timesteps",
+    "_shift_unchanged",
+]
+
+
+class Profiler:
+    """Schedule のフェーズごとの時間と呼び出し回数などを集計する
+
+    attach したオブジェクトのメソッドをインスタンスごとに計測用のラッパーに置き換えるので、
+    attach しなければスケジューラには何も足されない。
+    interval を指定すると、interval タイムステップごとに累積値を series に記録する。
+    """
+
+    def __init__(self, interval: Optional[int] = None):
+        self.interval = interval
+        self.phase_seconds = defaultdict(float)
+        self.phase_calls = defaultdict(int)
+        self.ticks = 0
+        self.skipped_timesteps = 0
+        # リソースマップ上で予約・解放したセル数
+        self.cells_touched = 0
+        # FCFS・バックフィルで調べたジョブ数と割り当てたジョブ数
+        self.jobs_examined = 0
+        self.jobs_placed = 0
+        self.queue_length_sum = 0
+        self.queue_length_max = 0
+        self.series = []
+        # 計測用のラッパーに置き換えたメソッド (オブジェクト, メソッド名)
+        self.wrapped = []
+
+    def attach(self, schedule, resource):
+        for phase in SCHEDULE_PHASES:
+            self._wrap_phase(schedule, phase)
+        self._wrap_phase(resource, "proceed_timestep", "resource.proceed_timestep")
+        for method in ["_schedule_fcfs", "_backfill"]:
+            self._wrap_placement(schedule, method)
+        self._wrap_tick(schedule)
+        self._wrap_skip(schedule)
+        resource_map = schedule.resource_map
+        for method in ["reserve", "release", "release_job"]:
+            if hasattr(resource_map, method):
+                self._wrap_cells(resource_map, method)
+
+    def detach(self):
+        """attach したラッパーを外し、元のメソッドに戻す"""
+        for obj, method in set(self.wrapped):
+            delattr(obj, method)
+        self.wrapped = []
+
+    def _wrap_phase(self, obj, method, phase=None):
+        phase = phase or method
+        function = getattr(obj, method)
+
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            start_time = time.perf_counter()
+            result = function(*args, **kwargs)
+            self.phase_seconds[phase] += time.perf_counter() - start_time
+            self.phase_calls[phase] += 1
+            return result
+
+        setattr(obj, method, wrapper)
+        self.wrapped.append((obj, method))
+
+    def _wrap_placement(self, schedule, method):
+        function = getattr(schedule, method)
+
+        @wraps(function)
+        def wrapper(job_queue, resource):
+            queue_length = len(job_queue)
+            visible = min(queue_length, schedule.watch_job_size)
+            result = function(job_queue, resource)
+            placed = queue_length - len(job_queue)
+            # FCFSは割り当てられないジョブが現れた時点で終了する
+            if method == "_schedule_fcfs":
+                self.jobs_examined += min(placed + 1, visible)
+            else:
+                self.jobs_examined += visible
+            self.jobs_placed += placed
+            return result
+
+        setattr(schedule, method, wrapper)
+        self.wrapped.append((schedule, method))
+
+    def _wrap_tick(self, schedule):
+        function = schedule.proceed_timestep
+
+        @wraps(function)
+        def wrapper(job_queue, resource, jobs):
+            start_time = time.perf_counter()
+            result = function(job_queue, resource, jobs)
+            self.phase_seconds["proceed_timestep"] += time.perf_counter() - start_time
+            self.phase_calls["proceed_timestep"] += 1
+            self.ticks += 1
+            queue_length = len(job_queue)
+            self.queue_length_sum += queue_length
+            self.queue_length_max = max(self.queue_length_max, queue_length)
+            if self.interval and self.ticks % self.interval == 0:
+                self.series.append(
+                    {
+                        "timestep": int(schedule.timestep),
+                        "queue_length": queue_length,
+                        **self._counters(),
+                    }
+                )
+            return result
+
+        schedule.proceed_timestep = wrapper
+        self.wrapped.append((schedule, "proceed_timestep"))
+
+    def _wrap_skip(self, schedule):
+        function = schedule.skip_idle_timesteps
+
+        @wraps(function)
+        def wrapper(job_queue, resource):
+            skipped = function(job_queue, resource)
+            self.skipped_timesteps += int(skipped)
+            return skipped
+
+        schedule.skip_idle_timesteps = wrapper
+        self.wrapped.append((schedule, "skip_idle_timesteps"))
+
+    def _wrap_cells(self, resource_map, method):
+        function = getattr(resource_map, method)
+        timestep_window = resource_map.timestep_window
+
+        @wraps(function)
+        def wrapper(*args):
+            node_indecies, start, end = args[-3:]
+            self.cells_touched += len(node_indecies) * int(
+                max(min(end, timestep_window) - start, 0)
+            )
+            return function(*args)
+
+        setattr(resource_map, method, wrapper)
+        self.wrapped.append((resource_map, method))
+
+    def _counters(self):
+        return {
+            "ticks": self.ticks,
+            "skipped_timesteps": self.skipped_timesteps,
+            "cells_touched": self.cells_touched,
+            "jobs_examined": self.jobs_examined,
+            "jobs_placed": self.jobs_placed,
+            **{
+                f"{phase}_seconds": seconds
+                for phase, seconds in self.phase_seconds.items()
+            },
+        }
+
+    def summary(self):
+        return {
+            "phases": {
+                phase: {
+                    "seconds": self.phase_seconds[phase],
+                    "calls": self.phase_calls[phase],
+                }
+                for phase in self.phase_seconds
+            },
+            "ticks": self.ticks,
+            "skipped_timesteps": self.skipped_timesteps,
+            "cells_touched": self.cells_touched,
+            "jobs_examined": self.jobs_examined,
+            "jobs_placed": self.jobs_placed,
+            "queue_length_mean": self.queue_length_sum / max(self.ticks, 1),
+            "queue_length_max": self.queue_length_max,
+        }
+
+    def print_summary(self):
+        print("*** Profile ***")
+        for phase, stats in sorted(
+            self.summary()["phases"].items(), key=lambda item: -item[1]["seconds"]
+        ):
+            print(f"{phase}: {stats['seconds']:.2f} s / {stats['calls']} calls")
+        print(f"Ticks: {self.ticks} (+{self.skipped_timesteps} skipped)")
+        print(f"Cells touched: {self.cells_touched}")
+        print(f"Jobs examined / placed: {self.jobs_examined} / {self.jobs_placed}")
+        print(
+            f"Queue length: mean {self.queue_length_sum / max(self.ticks, 1):.1f}, max {self.queue_length_max}"
+        )
@@ -25,6 +25,14 @@ class Resource:
         for node in self.nodes:
             node.proceed_timestep()
 
+    def skip_timesteps(self, timesteps: int):
+        """ジョブが完了しないことが分かっている複数のタイムステップをまとめて進める"""
+        for node in self.nodes:
+            node.skip_timesteps(timesteps)
+
+    def idle_nodes(self) -> np.ndarray:
+        return np.array([node.state == NodeState.IDLE for node in self.nodes])
+
     def get_completed_jobs(self):
         completed_job_set = set()
         for node in self.nodes:
@@ -65,6 +73,13 @@ class Node:
             if self.remaining_time <= 0:
                 self.state = NodeState.COMPLETE
 
+    def skip_timesteps(self, timesteps: int):
+        if self.state == NodeState.RUNNING:
+            self.remaining_time -= self.timestep_seconds * timesteps
+            self.scheduled_remaining_timestep = max(
+                self.scheduled_remaining_timestep - timesteps, 0
+            )
+
     def allocate_job(self, job: Job):
         self.job = job
         self.remaining_time = job.real_time
@@ -72,3 +87,111 @@ class Node:
             job.pred_time / self.timestep_seconds
         ).astype(int)
         self.state = NodeState.RUNNING
+
+
+# ArrayResource の状態コード
+NODE_STATES = [NodeState.IDLE, NodeState.RUNNING, NodeState.COMPLETE]
+IDLE, RUNNING, COMPLETE = range(len(NODE_STATES))
+
+
+class ArrayResource:
+    """ノードの状態をNumPy配列で持つ Resource
+
+    nodes[node_index] は Node と同じ属性を持つ NodeView で、配列を読み書きする。
+    """
+
+    def __init__(self, node_size, timestep_seconds) -> None:
+        self.timestep_seconds = timestep_seconds
+        self.remaining_time = np.zeros(node_size, dtype=np.int64)
+        self.scheduled_remaining_timestep = np.zeros(node_size, dtype=np.int64)
+        self.state = np.full(node_size, IDLE, dtype=np.int8)
+        self.job_index = np.full(node_size, -1, dtype=np.int64)
+        # 実行中のジョブ (job_index -> Job)
+        self.jobs = {}
+        self.nodes = [NodeView(self, node_index) for node_index in range(node_size)]
+
+    def print_nodes(self):
+        print("*** Nodes ***")
+        for i, node in enumerate(self.nodes):
+            job_index = node.job.job_index if node.job else None
+            print(
+                f"Node {i}: {job_index} - {node.remaining_time} - {node.scheduled_remaining_timestep} - {node.state}"
+            )
+
+    def proceed_timestep(self):
+        running = self.state == RUNNING
+        self.remaining_time[running] -= self.timestep_seconds
+        self.scheduled_remaining_timestep[
+            running & (self.scheduled_remaining_timestep > 0)
+        ] -= 1
+        self.state[running & (self.remaining_time <= 0)] = COMPLETE
+
+    def skip_timesteps(self, timesteps: int):
+        """ジョブが完了しないことが分かっている複数のタイムステップをまとめて進める"""
+        running = self.state == RUNNING
+        self.remaining_time[running] -= self.timestep_seconds * timesteps
+        self.scheduled_remaining_timestep[running] = np.maximum(
+            self.scheduled_remaining_timestep[running] - timesteps, 0
+        )
+
+    def idle_nodes(self) -> np.ndarray:
+        return self.state == IDLE
+
+    def get_completed_jobs(self):
+        completed = self.state == COMPLETE
+        self.state[completed] = IDLE
+        return [
+            self.jobs.pop(job_index)
+            for job_index in np.unique(self.job_index[completed]).tolist()
+        ]
+
+    def get_running_jobs(self):
+        return [
+            self.jobs[job_index]
+            for job_index in np.unique(self.job_index[self.state == RUNNING]).tolist()
+        ]
+
+    def is_running(self):
+        return bool((self.state == RUNNING).any())
+
+    def allocate_job(self, node_index: int, job: Job):
+        self.job_index[node_index] = job.job_index
+        self.remaining_time[node_index] = job.real_time
+        self.scheduled_remaining_timestep[node_index] = np.ceil(
+            job.pred_time / self.timestep_seconds
+        ).astype(int)
+        self.state[node_index] = RUNNING
+        self.jobs[job.job_index] = job
+
+
+class NodeView:
+    """ArrayResource の1つのノード"""
+
+    __slots__ = ("resource", "node_index")
+
+    def __init__(self, resource: ArrayResource, node_index: int):
+        self.resource = resource
+        self.node_index = node_index
+
+    @property
+    def job(self) -> Job | None:
+        return self.resource.jobs.get(int(self.resource.job_index[self.node_index]))
+
+    @property
+    def remaining_time(self) -> int:
+        return int(self.resource.remaining_time[self.node_index])
+
+    @property
+    def scheduled_remaining_timestep(self) -> int:
+        return int(self.resource.scheduled_remaining_timestep[self.node_index])
+
+    @property
+    def state(self) -> NodeState:
+        return NODE_STATES[self.resource.state[self.node_index]]
+
+    @state.setter
+    def state(self, state: NodeState):
+        self.resource.state[self.node_index] = NODE_STATES.index(state)
+
+    def allocate_job(self, job: Job):
+        self.resource.allocate_job(self.node_index, job)
@@ -0,0 +1,410 @@
+from typing import List, Optional
+import numpy as np
+from modules import kernels
+
+
+def next_busy_timestep(busy: np.ndarray):
+    """各ノード・各列について、その列以降で最初にビジーになる列を返す
+
+    ビジーになる列がない場合はint32の最大値を返す。
+    """
+    columns = np.where(
+        busy, np.arange(busy.shape[1], dtype=np.int32), np.iinfo(np.int32).max
+    )
+    return np.minimum.accumulate(columns[:, ::-1], axis=1)[:, ::-1]
+
+
+# バイトごとの1のビット数（np.bitwise_count がない NumPy のため）
+POPCOUNT_TABLE = np.array([bin(byte).count("1") for byte in range(256)], dtype=np.uint8)
+
+
+def popcount(words: np.ndarray) -> np.ndarray:
+    """uint64 の配列の最後の軸について、1のビット数の合計を返す"""
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(words).sum(axis=-1, dtype=np.int64)
+    return (
+        POPCOUNT_TABLE[words.view(np.uint8)]
+        .reshape(*words.shape[:-1], -1)
+        .sum(axis=-1, dtype=np.int64)
+    )
+
+
+def node_bits(node_indecies, word_count: int) -> np.ndarray:
+    """ノードのビットを立てた uint64 の配列（ノード i は i // 64 番目の語の i % 64 ビット目）"""
+    bits = np.zeros(word_count * 64, dtype=bool)
+    bits[node_indecies] = True
+    return np.packbits(bits, bitorder="little").view(np.uint64)
+
+
+def unpack_bits(words: np.ndarray, node_size: int) -> np.ndarray:
+    """uint64 の配列の最後の軸をノードごとの bool に展開する"""
+    bits = np.unpackbits(
+        np.ascontiguousarray(words).view(np.uint8), axis=-1, bitorder="little"
+    )
+    return bits[..., :node_size].astype(bool)
+
+
+class ResourceMap:
+    """ノードごとのジョブの予約を管理するリソースマップの共通インターフェース
+
+    時刻はすべて現在のタイムステップを0とする相対タイムステップで表す。
+    予約は [start, end) の半開区間。
+    """
+
+    def __init__(self, node_size: int, timestep_window: int):
+        self.node_size = node_size
+        self.timestep_window = timestep_window
+        # マップを書き換えるたびに増やす
+        self.version = 0
+
+    def reserve(self, job_index: int, node_indecies: List[int], start: int, end: int):
+        """ノードの [start, end) をジョブに予約する"""
+        raise NotImplementedError
+
+    def release(self, node_indecies: List[int], start: int, end: int):
+        """ノードの [start, end) の予約を解放する"""
+        raise NotImplementedError
+
+    def is_free(self, node_indecies: List[int], timestep: int) -> bool:
+        """指定したノードがすべて timestep で空いているかどうか"""
+        raise NotImplementedError
+
+    def free_nodes(self, timestep: int) -> np.ndarray:
+        """timestep で空いているノードのマスクを返す"""
+        raise NotImplementedError
+
+    def head_jobs(self) -> np.ndarray:
+        """各ノードで現在のタイムステップに予約されているジョブ (空きは-1) を返す"""
+        raise NotImplementedError
+
+    def candidate_start_times(self, node_size: int, length: int, last_start: int):
+        """[0, last_start] の中で、ジョブを割り当てられる可能性のある開始タイムステップを昇順に返す"""
+        return range(last_start + 1)
+
+    def can_fit(self, node_size: int, start: int, length: int) -> bool:
+        """start で空いているノードがすべて length の間空いていて、かつ node_size 以上あるか"""
+        raise NotImplementedError
+
+    def find_earliest_start_time(
+        self, node_size: int, length: int, last_start: int, lower_bound: int = 0
+    ) -> Optional[int]:
+        """[lower_bound, last_start] の中で can_fit を満たす最初のタイムステップを返す"""
+        for t in self.candidate_start_times(node_size, length, last_start):
+            if t < lower_bound:
+                continue
+            if self.can_fit(node_size, t, length):
+                return t
+        return None
+
+    def select_nodes(self, node_size: int, start: int, length: int) -> List[int]:
+        """[start, start + length) の間空いているノードをインデックスの小さい順に node_size 個選ぶ"""
+        free_nodes = np.flatnonzero(self.free_run_lengths(start, length) >= length)
+        return free_nodes[: max(node_size, 1)].tolist()
+
+    def free_run_lengths(self, start: int, limit: Optional[int]) -> np.ndarray:
+        """各ノードについて、start から連続して空いている長さを返す
+
+        start でビジーなノードは0、ウィンドウの末尾まで空いているノードはint32の最大値。
+        limit を指定した場合、limit 以上の長さは limit 以上の任意の値でよい。
+        """
+        raise NotImplementedError
+
+    def shift(self, timesteps: int):
+        """先頭列（実行中のジョブ）を残し、それ以降の予約を timesteps だけ前にずらす"""
+        raise NotImplementedError
+
+    def compact_start(self, node_indecies: List[int], start: int) -> int:
+        """指定したノードがすべて空いている間、start を前にずらした開始タイムステップを返す"""
+        while start > 0 and self.is_free(node_indecies, start - 1):
+            start -= 1
+        return start
+
+    def prepare_search(self):
+        """複数のスレッドから探索する前に、探索で使うキャッシュを計算しておく"""
+
+    def column_capacity(self):
+        """各列について、空いているノード数と、空いているノードが連続して空いている長さの最小値を返す
+
+        空き状態がウィンドウの末尾まで続くノードの長さは無限大（int32の最大値）として扱う。
+        """
+        raise NotImplementedError
+
+    def busy_columns(self, node_indecies: np.ndarray) -> np.ndarray:
+        """各列について、指定したノードのいずれかがビジーかどうかを返す"""
+        raise NotImplementedError
+
+
+class DenseResourceMap(ResourceMap):
+    """ノード×タイムステップの行列でジョブの予約を管理する
+
+    vectorized=True の場合、各列の空きノード数と空き長さの最小値 (column_capacity) を
+    使ってマップ全体を一度に探索する。このとき、各ノード・各列について次にビジーになる列
+    (next_busy) と各列の空きノード数を予約・解放のたびに書き換えたノード分だけ更新し、
+    空き長さの最小値は next_busy が変わった列だけ探索の直前に計算し直す。
+    compiled=True の場合（vectorized=False のときのみ）、探索と前詰めを modules.kernels の
+    コンパイルしたカーネルで行う。None の場合は numba がある場合だけ使う。
+    packed=True の場合（vectorized=False のときのみ）、各列のビジーなノードを uint64 の
+    ビット列 (busy_words) でも持ち、空き判定はビット列の OR と popcount で行う。
+    """
+
+    def __init__(
+        self,
+        node_size: int,
+        timestep_window: int,
+        vectorized=False,
+        compiled=None,
+        packed=False,
+    ):
+        super().__init__(node_size, timestep_window)
+        self.map = np.full((node_size, timestep_window), -1, dtype=np.int32)
+        self.vectorized = vectorized
+        if packed and vectorized:
+            raise ValueError("packed free mask requires vectorized=False")
+        self.packed = packed
+        if packed:
+            self.word_count = -(-node_size // 64)
+            self.busy_words = np.zeros(
+                (timestep_window, self.word_count), dtype=np.uint64
+            )
+            self.node_words = node_bits(np.arange(node_size), self.word_count)
+            self._free_counts_version = -1
+        if compiled is None:
+            compiled = kernels.NUMBA_AVAILABLE and not vectorized and not packed
+        if compiled and (vectorized or packed):
+            raise ValueError(
+                "compiled kernels require vectorized=False and packed=False"
+            )
+        if compiled and not kernels.NUMBA_AVAILABLE:
+            raise ValueError("compiled kernels require numba")
+        self.compiled = compiled
+        self._capacity = None
+        self._capacity_version = -1
+        if vectorized:
+            self._rebuild_index()
+
+    def __str__(self):
+        return str(self.map)
+
+    def reserve(self, job_index, node_indecies, start, end):
+        if self.vectorized and start < end and len(node_indecies) > 0:
+            was_free = self.map[node_indecies, start:end] == -1
+            self.available_counts[start:end] -= np.count_nonzero(was_free, axis=0)
+            next_busy = self.next_busy[node_indecies, :end]
+            # start より前で start まで空いていた列は、start で初めてビジーになる
+            changed = next_busy[:, :start] > start
+            next_busy[:, :start][changed] = start
+            next_busy[:, start:] = np.arange(start, end)
+            self.next_busy[node_indecies, :end] = next_busy
+            self._mark_dirty(self._first_changed_column(changed, start), end)
+        self.map[node_indecies, start:end] = job_index
+        if self.packed and len(node_indecies) > 0:
+            self.busy_words[start:end] |= node_bits(node_indecies, self.word_count)
+        self.version += 1
+
+    def release(self, node_indecies, start, end):
+        if self.vectorized and start < end and len(node_indecies) > 0:
+            was_busy = self.map[node_indecies, start:end] != -1
+            self.available_counts[start:end] += np.count_nonzero(was_busy, axis=0)
+            next_busy = self.next_busy[node_indecies, :end]
+            # start まで空いていた列と解放した列は、end 以降で最初にビジーになる列まで空く
+            if end < self.timestep_window:
+                after_end = self.next_busy[node_indecies, end][:, np.newaxis]
+            else:
+                after_end = np.iinfo(np.int32).max
+            changed = next_busy >= start
+            self.next_busy[node_indecies, :end] = np.where(
+                changed, after_end, next_busy
+            )
+            self._mark_dirty(self._first_changed_column(changed, start), end)
+        self.map[node_indecies, start:end] = -1
+        if self.packed and len(node_indecies) > 0:
+            self.busy_words[start:end] &= ~node_bits(node_indecies, self.word_count)
+        self.version += 1
+
+    def is_free(self, node_indecies, timestep):
+        if self.packed:
+            return not np.any(
+                self.busy_words[timestep] & node_bits(node_indecies, self.word_count)
+            )
+        return all(self.map[node_indecies, timestep] == -1)
+
+    def free_nodes(self, timestep):
+        if self.packed:
+            return ~unpack_bits(self.busy_words[timestep], self.node_size)
+        return self.map[:, timestep] == -1
+
+    def head_jobs(self):
+        return self.map[:, 0]
+
+    def candidate_start_times(self, node_size, length, last_start):
+        if self.packed:
+            return np.flatnonzero(self._free_counts()[: last_start + 1] >= node_size)
+        if not self.vectorized:
+            return super().candidate_start_times(node_size, length, last_start)
+        available_counts, free_lengths = self.column_capacity()
+        return np.flatnonzero(
+            (available_counts[: last_start + 1] >= node_size)
+            & (free_lengths[: last_start + 1] >= length)
+        )
+
+    def can_fit(self, node_size, start, length):
+        if self.vectorized:
+            available_counts, free_lengths = self.column_capacity()
+            return bool(
+                available_counts[start] >= node_size and free_lengths[start] >= length
+            )
+        if self.compiled:
+            return bool(kernels.can_fit(self.map, node_size, start, length))
+        if self.packed:
+            if self._free_counts()[start] < node_size:
+                return False
+            free_words = ~self.busy_words[start] & self.node_words
+            busy_words = np.bitwise_or.reduce(
+                self.busy_words[start : start + length], axis=0
+            )
+            return not np.any(busy_words & free_words)
+        available_nodes = np.where(self.map[:, start] == -1)[0]
+        if len(available_nodes) < node_size:
+            return False
+        return bool(np.all(self.map[available_nodes, start : start + length] == -1))
+
+    def find_earliest_start_time(self, node_size, length, last_start, lower_bound=0):
+        if self.vectorized:
+            candidates = self.candidate_start_times(node_size, length, last_start)
+            candidates = candidates[np.searchsorted(candidates, lower_bound) :]
+            return int(candidates[0]) if len(candidates) > 0 else None
+        if self.compiled:
+            t = kernels.find_earliest_start_time(
+                self.map, node_size, length, last_start, lower_bound
+            )
+            return int(t) if t >= 0 else None
+        if self.packed:
+            candidates = self.candidate_start_times(node_size, length, last_start)
+            for t in candidates[np.searchsorted(candidates, lower_bound) :]:
+                if self.can_fit(node_size, t, length):
+                    return int(t)
+            return None
+        for t in range(lower_bound, last_start + 1):
+            # 各タイムステップで利用可能なノード数をカウント
+            available_nodes = np.where(self.map[:, t] == -1)[0]
+
+            if len(available_nodes) < node_size:
+                # 必要なノード数が利用可能でない場合はスキップ
+                continue
+
+            # 指定された期間にわたって、必要なノード数が連続して利用可能かチェック
+            consecutive_available = True
+            for dt in range(length):
+                if not all(self.map[available_nodes, t + dt] == -1):
+                    consecutive_available = False
+                    break
+
+            if consecutive_available:
+                # すべての条件を満たす場合は、このタイムステップを返す
+                return t
+
+        return None  # 適切な開始時間が見つからない場合
+
+    def free_run_lengths(self, start, limit):
+        if self.vectorized:
+            next_busy = self.next_busy[:, start].astype(np.int64)
+        elif self.compiled:
+            return kernels.free_run_lengths(
+                self.map, start, -1 if limit is None else limit
+            )
+        else:
+            end = self.timestep_window if limit is None else start + max(limit, 1)
+            if self.packed:
+                busy = unpack_bits(self.busy_words[start:end], self.node_size).T
+            else:
+                busy = self.map[:, start:end] != -1
+            next_busy = np.where(
+                busy.any(axis=1), start + busy.argmax(axis=1), np.iinfo(np.int32).max
+            )
+        return np.where(
+            next_busy >= np.iinfo(np.int32).max, next_busy, next_busy - start
+        )
+
+    def shift(self, timesteps):
+        if timesteps < self.timestep_window - 1:
+            self.map[:, 1 : self.timestep_window - timesteps] = self.map[
+                :, 1 + timesteps :
+            ]
+        self.map[:, max(1, self.timestep_window - timesteps) :] = -1
+        if self.packed:
+            if timesteps < self.timestep_window - 1:
+                self.busy_words[1 : self.timestep_window - timesteps] = self.busy_words[
+                    1 + timesteps :
+                ]
+            self.busy_words[max(1, self.timestep_window - timesteps) :] = 0
+        self.version += 1
+        if self.vectorized:
+            self._rebuild_index()
+
+    def compact_start(self, node_indecies, start):
+        if self.compiled:
+            return int(
+                kernels.compact_start(
+                    self.map, np.asarray(node_indecies, dtype=np.int64), start
+                )
+            )
+        return super().compact_start(node_indecies, start)
+
+    def prepare_search(self):
+        if self.vectorized:
+            self.column_capacity()
+
+    def column_capacity(self):
+        if self.vectorized:
+            if self._dirty_start < self._dirty_end:
+                columns = np.arange(self._dirty_start, self._dirty_end)
+                next_busy = self.next_busy[:, self._dirty_start : self._dirty_end]
+                self.free_lengths[self._dirty_start : self._dirty_end] = (
+                    np.where(
+                        next_busy > columns, next_busy, np.iinfo(np.int32).max
+                    ).min(axis=0)
+                    - columns
+                )
+                self._dirty_start, self._dirty_end = self.timestep_window, 0
+            return self.available_counts, self.free_lengths
+        if self._capacity_version == self.version:
+            return self._capacity
+        free = self.map == -1
+        next_busy = next_busy_timestep(~free)
+        timesteps = np.arange(self.timestep_window)
+        free_lengths = (
+            np.where(free, next_busy, np.iinfo(np.int32).max).min(axis=0) - timesteps
+        )
+        available_counts = np.count_nonzero(free, axis=0)
+        self._capacity = (available_counts, free_lengths)
+        self._capacity_version = self.version
+        return self._capacity
+
+    def busy_columns(self, node_indecies):
+        return (self.map[node_indecies] != -1).any(axis=0)
+
+    def _free_counts(self):
+        """各列の空きノード数（ビット列から数え、マップが書き換えられるまで使い回す）"""
+        if self._free_counts_version != self.version:
+            self.free_counts = self.node_size - popcount(self.busy_words)
+            self._free_counts_version = self.version
+        return self.free_counts
+
+    def _rebuild_index(self):
+        """マップ全体から next_busy と各列の空きノード数を計算し直す"""
+        free = self.map == -1
+        self.next_busy = next_busy_timestep(~free)
+        self.available_counts = np.count_nonzero(free, axis=0)
+        self.free_lengths = np.zeros(self.timestep_window, dtype=np.int64)
+        self._dirty_start, self._dirty_end = 0, self.timestep_window
+
+    def _mark_dirty(self, start, end):
+        self._dirty_start = min(self._dirty_start, start)
+        self._dirty_end = max(self._dirty_end, min(end, self.timestep_window))
+
+    def _first_changed_column(self, changed: np.ndarray, default: int):
+        """next_busy が変わった最初の列を返す"""
+        changed_columns = changed.any(axis=0)
+        if changed_columns.any():
+            return min(int(np.argmax(changed_columns)), default)
+        return default
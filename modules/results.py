@@ -0,0 +1,181 @@
+import json
+import os
+from pathlib import Path
+from typing import List
+import numpy as np
+import pandas as pd
+from modules.job import ArrayWorkload, Job, StreamingWorkload
+
+RESULT_COLUMNS = [
+    "job_index",
+    "log_id",
+    "pred_time",
+    "real_time",
+    "node_size",
+    "submit_timestep",
+    "queued_timestep",
+    "start_timestep",
+    "is_backfilled",
+    "allocated_node_indecies",
+]
+# 未設定の場合がある列
+TIMESTEP_COLUMNS = ["submit_timestep", "queued_timestep", "start_timestep"]
+
+
+def job_row(job: Job) -> list:
+    return [
+        (
+            [int(node_index) for node_index in job.allocated_node_indecies]
+            if column == "allocated_node_indecies"
+            else getattr(job, column)
+        )
+        for column in RESULT_COLUMNS
+    ]
+
+
+def results_frame(rows: List[list]) -> pd.DataFrame:
+    """job_row の行から、未設定のタイムステップを欠損値とする DataFrame を作る"""
+    df = pd.DataFrame(rows, columns=RESULT_COLUMNS)
+    for column in TIMESTEP_COLUMNS:
+        df[column] = df[column].astype("Int64")
+    df["is_backfilled"] = df["is_backfilled"].astype(bool)
+    return df
+
+
+def job_results(workload) -> pd.DataFrame:
+    """ワークロードのすべてのジョブの結果を返す"""
+    if isinstance(workload, StreamingWorkload):
+        raise ValueError("streaming workloads write results with result_writer")
+    if not isinstance(workload, ArrayWorkload):
+        return results_frame([job_row(job) for job in workload.jobs])
+
+    # 配列からまとめて作る（-1は未設定）
+    def timesteps(values):
+        return pd.array(np.where(values == -1, None, values), dtype="Int64")
+
+    job_count = len(workload)
+    return pd.DataFrame(
+        {
+            "job_index": np.arange(job_count),
+            "log_id": workload.log_id,
+            "pred_time": workload.pred_time,
+            "real_time": workload.real_time,
+            "node_size": workload.node_size,
+            "submit_timestep": (
+                timesteps(workload.submit_timestep)
+                if workload.submit_timestep is not None
+                else pd.array([None] * job_count, dtype="Int64")
+            ),
+            "queued_timestep": timesteps(workload.queued_timestep),
+            "start_timestep": timesteps(workload.start_timestep),
+            "is_backfilled": workload.is_backfilled,
+            "allocated_node_indecies": [
+                node_indecies[node_indecies != -1].tolist()
+                for node_indecies in np.split(
+                    workload.allocated_node_indecies,
+                    workload.allocated_node_offsets[1:-1],
+                )
+            ],
+        }
+    )
+
+
+def metadata_path(path: str) -> Path:
+    """結果ファイルと同じ名前の実行のメタデータ (.json) のパス"""
+    return Path(path).with_suffix(".json")
+
+
+def json_default(value):
+    """json.dump の default（numpy のスカラーは Python の値に、それ以外は文字列にする）"""
+    return value.item() if hasattr(value, "item") else str(value)
+
+
+def write_metadata(path: str, metadata: dict):
+    with open(metadata_path(path), "w") as f:
+        json.dump(metadata, f, indent=2, default=json_default)
+
+
+def write_results(path: str, results: pd.DataFrame, metadata: dict):
+    """ジョブごとの結果を parquet に、実行のメタデータを同じ名前の .json に書き出す"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    table = pa.Table.from_pandas(results, preserve_index=False)
+    table = table.replace_schema_metadata(
+        {
+            **(table.schema.metadata or {}),
+            b"simulation": json.dumps(metadata, default=str),
+        }
+    )
+    pq.write_table(table, path)
+    write_metadata(path, metadata)
+
+
+class CsvResultWriter:
+    """完了したジョブの結果をCSVに少しずつ追記する
+
+    buffer_size 件たまるごとに書き出すので、メモリに残るのはその分だけ。
+    """
+
+    def __init__(self, path: str, buffer_size: int = 10000):
+        self.path = path
+        self.buffer_size = buffer_size
+        self.rows = []
+        self.written_job_count = 0
+        if os.path.exists(path):
+            os.remove(path)
+
+    def write(self, jobs: List[Job]):
+        for job in jobs:
+            self.rows.append(job_row(job))
+        if len(self.rows) >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        if not self.rows:
+            return
+        results_frame(self.rows).to_csv(
+            self.path,
+            mode="a",
+            header=self.written_job_count == 0,
+            index=False,
+        )
+        self.written_job_count += len(self.rows)
+        self.rows = []
+
+    def close(self):
+        self.flush()
+
+
+class ParquetResultWriter(CsvResultWriter):
+    """完了したジョブの結果を parquet に行グループとして少しずつ書き出す"""
+
+    def __init__(self, path: str, buffer_size: int = 100000):
+        super().__init__(path, buffer_size)
+        self.writer = None
+
+    def flush(self):
+        if not self.rows:
+            return
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if self.writer is None:
+            table = pa.Table.from_pandas(results_frame(self.rows), preserve_index=False)
+            self.writer = pq.ParquetWriter(self.path, table.schema)
+        else:
+            # 欠損値だけの列などの型を最初の行グループに揃える
+            table = pa.Table.from_pandas(
+                results_frame(self.rows),
+                schema=self.writer.schema,
+                preserve_index=False,
+            )
+        self.writer.write_table(table)
+        self.written_job_count += len(self.rows)
+        self.rows = []
+
+    def close(self):
+        self.flush()
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
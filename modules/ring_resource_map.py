@@ -0,0 +1,207 @@
+import numpy as np
+from modules.resource_map import ResourceMap
+
+INFINITY = np.iinfo(np.int32).max
+
+
+class RingResourceMap(ResourceMap):
+    """ノード×タイムステップの行列を環状バッファとして使い、ジョブの予約を管理する
+
+    相対タイムステップ t の列は (origin + t) % timestep_window で、
+    タイムステップを進めるときは origin を進めて過ぎた列を空けるだけでよい。
+    各ノード・各列について次にビジーになるタイムステップ (next_busy) と、
+    各列で空いているノードが次にビジーになるタイムステップの最小値 (free_until) を
+    絶対タイムステップで持つので、時間軸を進めてもこれらを書き換える必要はない。
+    """
+
+    def __init__(self, node_size: int, timestep_window: int):
+        super().__init__(node_size, timestep_window)
+        # 相対タイムステップ0の絶対タイムステップ
+        self.origin = 0
+        self._clear()
+
+    def _clear(self):
+        self.map = np.full((self.node_size, self.timestep_window), -1, dtype=np.int32)
+        self.next_busy = np.full(
+            (self.node_size, self.timestep_window), INFINITY, dtype=np.int64
+        )
+        self.available_counts = np.full(self.timestep_window, self.node_size)
+        self.free_until = np.full(self.timestep_window, INFINITY, dtype=np.int64)
+        # free_until を計算し直す必要のある相対タイムステップの範囲
+        self._dirty_start, self._dirty_end = self.timestep_window, 0
+        self._capacity = None
+        self._capacity_version = -1
+
+    def __str__(self):
+        return str(self.to_array())
+
+    def to_array(self):
+        """相対タイムステップ0を先頭とする行列に変換する"""
+        return np.roll(self.map, -(self.origin % self.timestep_window), axis=1)
+
+    def advance(self, timesteps: int):
+        """時間軸を timesteps だけ進め、過ぎた列を末尾の空き列にする"""
+        if timesteps >= self.timestep_window:
+            self.origin += timesteps
+            self._clear()
+        else:
+            columns = self._columns(0, timesteps)
+            self.map[:, columns] = -1
+            self.next_busy[:, columns] = INFINITY
+            self.available_counts[columns] = self.node_size
+            self.free_until[columns] = INFINITY
+            self.origin += timesteps
+            self._dirty_start = max(self._dirty_start - timesteps, 0)
+            self._dirty_end = max(self._dirty_end - timesteps, 0)
+        self.version += 1
+
+    def reserve(self, job_index, node_indecies, start, end):
+        self._write(node_indecies, start, end, job_index)
+
+    def release(self, node_indecies, start, end):
+        self._write(node_indecies, start, end, -1)
+
+    def release_job(self, job_index, node_indecies, start, end):
+        """[start, end) のうち、指定したジョブが予約しているセルだけを解放する"""
+        self._write(node_indecies, start, end, -1, job_index=job_index)
+
+    def jobs_at(self, node_indecies, timestep):
+        """指定したノードで timestep に予約されているジョブを返す"""
+        if timestep >= self.timestep_window:
+            return []
+        jobs = self.map[node_indecies, self._columns(timestep, timestep + 1)[0]]
+        return [int(job_index) for job_index in np.unique(jobs) if job_index != -1]
+
+    def is_free(self, node_indecies, timestep):
+        column = self._columns(timestep, timestep + 1)[0]
+        return all(self.map[node_indecies, column] == -1)
+
+    def free_nodes(self, timestep):
+        return self.map[:, self._columns(timestep, timestep + 1)[0]] == -1
+
+    def head_jobs(self):
+        return self.map[:, self.origin % self.timestep_window]
+
+    def candidate_start_times(self, node_size, length, last_start):
+        available_counts, free_lengths = self.column_capacity()
+        return np.flatnonzero(
+            (available_counts[: last_start + 1] >= node_size)
+            & (free_lengths[: last_start + 1] >= length)
+        )
+
+    def can_fit(self, node_size, start, length):
+        available_counts, free_lengths = self.column_capacity()
+        return bool(
+            available_counts[start] >= node_size and free_lengths[start] >= length
+        )
+
+    def find_earliest_start_time(self, node_size, length, last_start, lower_bound=0):
+        candidates = self.candidate_start_times(node_size, length, last_start)
+        candidates = candidates[np.searchsorted(candidates, lower_bound) :]
+        return int(candidates[0]) if len(candidates) > 0 else None
+
+    def free_run_lengths(self, start, limit):
+        next_busy = self.next_busy[:, self._columns(start, start + 1)[0]]
+        return np.where(
+            next_busy >= INFINITY, INFINITY, next_busy - self.origin - start
+        )
+
+    def shift(self, timesteps):
+        head_jobs = self.head_jobs().copy()
+        self.advance(timesteps)
+        # 先頭列（実行中のジョブ）はそのまま残す
+        self._write(np.arange(self.node_size), 0, 1, head_jobs[:, np.newaxis])
+
+    def prepare_search(self):
+        self.column_capacity()
+
+    def column_capacity(self):
+        if self._capacity_version == self.version:
+            return self._capacity
+        if self._dirty_start < self._dirty_end:
+            columns = self._columns(self._dirty_start, self._dirty_end)
+            timesteps = self.origin + np.arange(self._dirty_start, self._dirty_end)
+            next_busy = self.next_busy[:, columns]
+            self.free_until[columns] = np.where(
+                next_busy > timesteps, next_busy, INFINITY
+            ).min(axis=0)
+            self._dirty_start, self._dirty_end = self.timestep_window, 0
+        columns = self._columns(0, self.timestep_window)
+        free_until = self.free_until[columns]
+        free_lengths = np.where(
+            free_until >= INFINITY,
+            INFINITY,
+            free_until - self.origin - np.arange(self.timestep_window),
+        )
+        self._capacity = (self.available_counts[columns], free_lengths)
+        self._capacity_version = self.version
+        return self._capacity
+
+    def busy_columns(self, node_indecies):
+        columns = self._columns(0, self.timestep_window)
+        return (self.map[node_indecies][:, columns] != -1).any(axis=0)
+
+    def _columns(self, start, end):
+        """相対タイムステップ [start, end) の列のインデックス（ウィンドウの末尾で打ち切る）"""
+        end = min(end, self.timestep_window)
+        return (self.origin + np.arange(start, end)) % self.timestep_window
+
+    def _slices(self, start, end):
+        """相対タイムステップ [start, end) の列を指すスライス（バッファの末尾で2つに分かれる）"""
+        first = (self.origin + start) % self.timestep_window
+        last = first + end - start
+        if last <= self.timestep_window:
+            return [slice(first, last)]
+        return [
+            slice(first, self.timestep_window),
+            slice(0, last - self.timestep_window),
+        ]
+
+    def _get(self, array, rows, start, end):
+        pieces = [array[rows, columns] for columns in self._slices(start, end)]
+        return pieces[0] if len(pieces) == 1 else np.concatenate(pieces, axis=1)
+
+    def _set(self, array, rows, start, end, values):
+        offset = 0
+        for columns in self._slices(start, end):
+            width = columns.stop - columns.start
+            array[rows, columns] = values[:, offset : offset + width]
+            offset += width
+
+    def _write(self, node_indecies, start, end, value, job_index=None):
+        """ノードの [start, end) を value にし、next_busy と各列の空きノード数を更新する
+
+        job_index を指定した場合は、そのジョブが予約しているセルだけを書き換える。
+        """
+        end = min(end, self.timestep_window)
+        if start >= end or len(node_indecies) == 0:
+            return
+        rows = np.asarray(node_indecies, dtype=int)
+        block = self._get(self.map, rows, start, end)
+        if job_index is None:
+            new_block = np.broadcast_to(value, block.shape)
+        else:
+            new_block = np.where(block == job_index, value, block)
+        self.available_counts[self._columns(start, end)] += np.count_nonzero(
+            new_block == -1, axis=0
+        ) - np.count_nonzero(block == -1, axis=0)
+        self._set(self.map, rows, start, end, new_block)
+
+        # [0, end) の next_busy を end の列から逆向きに計算し直す
+        next_busy = np.where(
+            self._get(self.map, rows, 0, end) != -1,
+            self.origin + np.arange(end),
+            INFINITY,
+        )
+        if end < self.timestep_window:
+            next_busy[:, -1] = np.minimum(
+                next_busy[:, -1],
+                self.next_busy[rows, (self.origin + end) % self.timestep_window],
+            )
+        next_busy = np.minimum.accumulate(next_busy[:, ::-1], axis=1)[:, ::-1]
+        changed = (next_busy != self._get(self.next_busy, rows, 0, end)).any(axis=0)
+        self._set(self.next_busy, rows, 0, end, next_busy)
+        first_changed = int(np.argmax(changed)) if changed.any() else start
+        self._dirty_start = min(self._dirty_start, first_changed, start)
+        self._dirty_end = max(self._dirty_end, end)
+        self.version += 1
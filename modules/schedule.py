@@ -1,8 +1,22 @@
-from typing import List
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+import heapq
 import numpy as np
 from modules.job_queue import JobQueue
-from modules.resource import Resource, NodeState
+from modules.resource import Resource
 from modules.job import Job
+from modules.resource_map import DenseResourceMap, next_busy_timestep
+from modules.availability_profile import AvailabilityProfile
+from modules.ring_resource_map import RingResourceMap
+from modules.feasibility_cache import FeasibilityCache
+from modules.allocation import ALLOCATION_STRATEGIES
+
+RESOURCE_MAP_BACKENDS = {
+    "dense": DenseResourceMap,
+    "profile": AvailabilityProfile,
+}
+
+BACKFILL_POLICIES = ["conservative", "easy"]
 
 
 class Schedule:
@@ -13,15 +27,101 @@ class Schedule:
         backfill_timestep_window: int,
         timestep_seconds: int,
         watch_job_size: int,
+        resource_map_backend: str = "dense",
+        vectorized_search: bool = False,
+        circular_time_axis: bool = False,
+        backfill_policy: str = "conservative",
+        skip_unchanged: bool = False,
+        feasibility_cache: bool = False,
+        backfill_workers: int = 1,
+        allocation_strategy: str = "first_fit",
+        rack_size: int = 32,
+        compiled_kernels: Optional[bool] = None,
+        packed_free_mask: bool = False,
     ):
         self.timestep = 0
         self.node_size = node_size
         self.timestep_window = timestep_window
         self.backfill_timestep_window = backfill_timestep_window
         self.timestep_seconds = timestep_seconds
-        self.resource_map = np.full((node_size, timestep_window), -1)
+        if resource_map_backend not in RESOURCE_MAP_BACKENDS:
+            raise ValueError(f"Unknown resource map backend: {resource_map_backend}")
+        if backfill_policy not in BACKFILL_POLICIES:
+            raise ValueError(f"Unknown backfill policy: {backfill_policy}")
+        if allocation_strategy not in ALLOCATION_STRATEGIES:
+            raise ValueError(f"Unknown allocation strategy: {allocation_strategy}")
+        if rack_size < 1:
+            raise ValueError("rack_size must be positive")
+        # ジョブに割り当てるノードの選び方（"topology"の場合はrack_size個ずつのノードを1つのラックとみなす）
+        self.allocation = ALLOCATION_STRATEGIES[allocation_strategy](
+            node_size, rack_size
+        )
+        # "conservative": バックフィルウィンドウ内のすべての開始タイムステップを調べる
+        # "easy": 先頭のジョブの開始を遅らせないジョブだけを今すぐ開始する
+        self.backfill_policy = backfill_policy
+        self.circular_time_axis = circular_time_axis
+        # コンパイルしたカーネルは行列で予約を管理し、ベクトル化した探索を使わない場合のみ
+        # （Noneの場合はnumbaがあれば使う）
+        if compiled_kernels and (
+            resource_map_backend != "dense" or circular_time_axis or vectorized_search
+        ):
+            raise ValueError(
+                "compiled_kernels requires the dense resource map without vectorized_search"
+            )
+        # ビット列の空きマスクは行列で予約を管理し、ベクトル化した探索を使わない場合のみ
+        if packed_free_mask and (
+            resource_map_backend != "dense" or circular_time_axis or vectorized_search
+        ):
+            raise ValueError(
+                "packed_free_mask requires the dense resource map without vectorized_search"
+            )
+        if circular_time_axis:
+            # 環状バッファは行列で予約を管理する場合のみ
+            if resource_map_backend != "dense":
+                raise ValueError("circular_time_axis requires the dense resource map")
+            self.resource_map = RingResourceMap(node_size, timestep_window)
+        elif vectorized_search:
+            # ベクトル化した探索は行列で予約を管理する場合のみ
+            if resource_map_backend != "dense":
+                raise ValueError("vectorized_search requires the dense resource map")
+            self.resource_map = DenseResourceMap(
+                node_size, timestep_window, vectorized=True
+            )
+        elif resource_map_backend == "dense":
+            self.resource_map = DenseResourceMap(
+                node_size,
+                timestep_window,
+                compiled=compiled_kernels,
+                packed=packed_free_mask,
+            )
+        else:
+            self.resource_map = RESOURCE_MAP_BACKENDS[resource_map_backend](
+                node_size, timestep_window
+            )
         self.watch_job_size = watch_job_size
-        self.jobs_in_schedule = []
+        # スケジュール済みのジョブ（job_indexをキーとし、リソースマップ上の開始順に並べる）
+        self.jobs_in_schedule = {}
+        # 実行中のジョブの完了タイムステップを管理するヒープ (completion_timestep, job_index)
+        self.completion_heap = []
+        # 前回の前詰め以降にスケジュールされたジョブ（環状バッファの場合のみ使う）
+        self.uncompacted_jobs = []
+        # 直前のタイムステップで完了したジョブ
+        self.completed_jobs = []
+        # Trueの場合、スケジューリングのたびに次に何かが変化しうるタイムステップを求めておき、
+        # それまでのタイムステップではスケジューリングを省いてリソースマップをずらすだけにする
+        self.skip_unchanged = skip_unchanged
+        self.next_event_timestep = 0
+        # Trueの場合、同じ形のジョブの探索結果をリソースマップが書き換えられるまで使い回す
+        self.feasibility_cache = FeasibilityCache() if feasibility_cache else None
+        # 2以上の場合、バックフィルの探索をスレッドプールで並列に行う
+        self.backfill_workers = backfill_workers
+        self._executor = None
+
+    def __getstate__(self):
+        # スレッドプールは保存・コピーできないので、必要になったときに作り直す
+        state = self.__dict__.copy()
+        state["_executor"] = None
+        return state
 
     def print_schedule(self):
         print("*** Schedule ***")
@@ -33,6 +133,8 @@ class Schedule:
     def create_initial_schedule(
         self, job_queue: JobQueue, resource: Resource, jobs: List[Job]
     ):
+        # 投入時刻を過ぎたジョブをキューに入れる
+        job_queue.submit_arrived_jobs(self.timestep)
         # キューに入ったタイムステップを設定
         job_queue.set_queued_timestep(self.timestep, self.watch_job_size)
         # FCFS scheduling
@@ -47,64 +149,176 @@ class Schedule:
         self, job_queue: JobQueue, resource: Resource, jobs: List[Job]
     ):
         """タイムステップを1進め、実行中のジョブの状態を更新する"""
+        if self.skip_unchanged and self.timestep + 1 < self.next_event_timestep:
+            # 完了・開始・前詰め・投入・新たな割り当てのいずれも起きないタイムステップ
+            self.timestep += 1
+            job_queue.set_queued_timestep(self.timestep, self.watch_job_size)
+            self._shift_unchanged(1, resource)
+            self.completed_jobs = []
+            return 0
+
         # 現在のタイムステップを1つ進める
         self.timestep += 1
 
+        # 投入時刻を過ぎたジョブをキューに入れる
+        job_queue.submit_arrived_jobs(self.timestep)
+
         # キューに入ったタイムステップを設定
         job_queue.set_queued_timestep(self.timestep, self.watch_job_size)
 
         resource.proceed_timestep()
         completed_jobs = resource.get_completed_jobs()
         running_jobs = resource.get_running_jobs()
+        self.completed_jobs = completed_jobs
 
-        # 完了したジョブをリソースマップから削除
+        if self.circular_time_axis:
+            self._advance_time_axis(completed_jobs, running_jobs, jobs)
+        else:
+            self._release_completed_jobs(completed_jobs)
+            self._shrink_running_jobs(running_jobs)
+            self._compact_waiting_jobs()
+
+        # スケジュール
+        self._schedule_fcfs(job_queue, resource)
+        self._backfill(job_queue, resource)
+
+        # アイドル中のノードについて、リソースマップ上の先頭のジョブを割り当てる
+        allocated_job_count = self._allocate_resources(resource, jobs)
+
+        if self.skip_unchanged:
+            self.next_event_timestep = self._next_event_timestep(job_queue)
+        return allocated_job_count
+
+    def _release_completed_jobs(self, completed_jobs: List[Job]):
+        """完了したジョブをリソースマップから削除する"""
+        # 実行中のジョブはallocated_node_indeciesの[0, occupied_range[1])を占有している
         for job in completed_jobs:
-            self.resource_map[self.resource_map == job.job_index] = -1
-            self.jobs_in_schedule.remove(job)
+            start, end = job.occupied_range
+            self.resource_map.release(job.allocated_node_indecies, start, end)
+            del self.jobs_in_schedule[job.job_index]
 
-        # 実行中かつリソースマップ上で残り時間のあるジョブについて、残り時間をリソースマップ上で更新
+    def _shrink_running_jobs(self, running_jobs: List[Job]):
+        """実行中かつリソースマップ上で残り時間のあるジョブについて、残り時間をリソースマップ上で更新"""
         for job in running_jobs:
             scheduled_remaining_timestep = job.allocated_nodes[
                 0
             ].scheduled_remaining_timestep
             if scheduled_remaining_timestep == 0:
                 continue
-            self.resource_map[
-                job.allocated_node_indecies, scheduled_remaining_timestep
-            ] = -1
+            self.resource_map.release(
+                job.allocated_node_indecies,
+                scheduled_remaining_timestep,
+                scheduled_remaining_timestep + 1,
+            )
             job.occupied_range[1] -= 1
 
-        # リソースマップ上で待機しているジョブについて、前詰めスケジューリングを行う
+    def _compact_waiting_jobs(self):
+        """リソースマップ上で待機しているジョブについて、前詰めスケジューリングを行う"""
         # jobs_in_scheduleをリソースマップ上の早い順に並び替え
-        self.jobs_in_schedule.sort(key=lambda x: x.occupied_range[0])
-        for job in self.jobs_in_schedule:
+        self.jobs_in_schedule = dict(
+            sorted(
+                self.jobs_in_schedule.items(),
+                key=lambda item: item[1].occupied_range[0],
+            )
+        )
+        for job in self.jobs_in_schedule.values():
             start, end = job.occupied_range
             if start == 0:
                 continue
-            self.resource_map[job.allocated_node_indecies, start:end] = -1
-            while (
-                all(self.resource_map[job.allocated_node_indecies, start - 1] == -1)
-                and start > 0
-            ):
-                start -= 1
+            self.resource_map.release(job.allocated_node_indecies, start, end)
+            start = self.resource_map.compact_start(job.allocated_node_indecies, start)
             end = start + job.timestep_length
 
-            self.resource_map[job.allocated_node_indecies, start:end] = job.job_index
+            self.resource_map.reserve(
+                job.job_index, job.allocated_node_indecies, start, end
+            )
             job.occupied_range = [start, end]
 
-        # スケジュール
-        self._schedule_fcfs(job_queue, resource)
-        self._backfill(job_queue, resource)
+    def _advance_time_axis(
+        self, completed_jobs: List[Job], running_jobs: List[Job], jobs: List[Job]
+    ):
+        """環状バッファの時間軸を1タイムステップ進める
 
-        # アイドル中のノードについて、リソースマップ上の先頭のジョブを割り当てる
-        allocated_job_count = self._allocate_resources(resource, jobs)
-        return allocated_job_count
+        時間軸を進めるとすべての予約がそのまま1列前にずれるので、
+        _release_completed_jobs から _compact_waiting_jobs までと同じ状態にするために
+        書き換える必要があるのは次のジョブだけである。
+        - 完了したジョブ（予約を解放する）
+        - 予測実行時間を超過して先頭列を占有し続ける実行中のジョブ
+        - 直前のセルが空いた、または予約が上書きされた待機中のジョブ
+        待機中のジョブは _compact_waiting_jobs と同じく開始の早い順に前詰めする。
+        """
+        self.resource_map.advance(1)
+        for job in self.jobs_in_schedule.values():
+            if job.start_timestep is None:
+                job.occupied_range = [
+                    job.occupied_range[0] - 1,
+                    job.occupied_range[1] - 1,
+                ]
+
+        # 前詰めするジョブのヒープ (start, job_index)
+        candidates = [
+            (job.occupied_range[0], job.job_index)
+            for job in self.uncompacted_jobs
+            if job.start_timestep is None
+        ]
+        self.uncompacted_jobs = []
+
+        def push_followers(node_indecies, timestep):
+            for job_index in self.resource_map.jobs_at(node_indecies, timestep):
+                if jobs[job_index].start_timestep is None:
+                    heapq.heappush(
+                        candidates, (jobs[job_index].occupied_range[0], job_index)
+                    )
+
+        # 完了したジョブをリソースマップから削除
+        for job in completed_jobs:
+            end = job.occupied_range[1] - 1
+            self.resource_map.release(job.allocated_node_indecies, 0, end)
+            push_followers(job.allocated_node_indecies, end)
+            del self.jobs_in_schedule[job.job_index]
+
+        # 予測実行時間を超過したジョブは先頭列を占有し続ける
+        for job in running_jobs:
+            if job.allocated_nodes[0].scheduled_remaining_timestep == 0:
+                push_followers(job.allocated_node_indecies, 0)
+                self.resource_map.reserve(
+                    job.job_index, job.allocated_node_indecies, 0, 1
+                )
+            else:
+                job.occupied_range[1] -= 1
+
+        heapq.heapify(candidates)
+        compacted_job_indecies = set()
+        while candidates:
+            _, job_index = heapq.heappop(candidates)
+            if job_index in compacted_job_indecies:
+                continue
+            compacted_job_indecies.add(job_index)
+            job = jobs[job_index]
+            start, end = job.occupied_range
+            self.resource_map.release_job(
+                job_index, job.allocated_node_indecies, start, end
+            )
+            if self.resource_map.is_free(job.allocated_node_indecies, start):
+                new_start = self.resource_map.compact_start(
+                    job.allocated_node_indecies, start
+                )
+            else:
+                # 先頭のセルが他のジョブに使われている場合はずれずに残る
+                new_start = start + 1
+            new_end = new_start + job.timestep_length
+            if new_start != start:
+                push_followers(job.allocated_node_indecies, end)
+            self.resource_map.reserve(
+                job_index, job.allocated_node_indecies, new_start, new_end
+            )
+            job.occupied_range = [new_start, new_end]
 
     def _schedule_fcfs(self, job_queue, resource):
         """Implement FCFS scheduling."""
         jobs_to_remove = []
         # job_queueの先頭からwatch_job_size分のジョブしか見えていない想定
-        for job in list(job_queue.queue)[: self.watch_job_size]:
+        for job in job_queue.head(self.watch_job_size):
             # 割り当て不可能なジョブが現れたらエラーを投げる
             if (
                 job.node_size > self.node_size
@@ -128,72 +342,235 @@ class Schedule:
                 ]
                 # keep track of jobs to remove from the queue
                 jobs_to_remove.append(job)
-                self.jobs_in_schedule.append(job)
+                self.jobs_in_schedule[job.job_index] = job
         # Remove scheduled jobs from the queue
         for job in jobs_to_remove:
-            job_queue.queue.remove(job)
+            job_queue.remove(job)
 
     def _backfill(self, job_queue: JobQueue, resource: Resource):
         """Implement backfill scheduling."""
+        if self.backfill_policy == "easy":
+            self._backfill_easy(job_queue, resource)
+            return
+        if self.backfill_workers > 1:
+            self._backfill_parallel(job_queue, resource)
+            return
         # FCFSスケジューリングで割り当てられなかったジョブを探す
         # バックフィル対象はjob_queueの先頭からwatch_job_size分
-        for job in list(job_queue.queue)[: self.watch_job_size]:
+        for job in job_queue.head(self.watch_job_size):
             # バックフィルウィンドウの範囲でバックフィルで利用可能なスペースを探す
-            for t in range(self.backfill_timestep_window):
-                # このタイムステップでジョブが実行可能かどうかを確認
-                if self._can_fit_job_in_timeslot(job, t):
-                    # ジョブをスケジュールに割り当てる
-                    self._assign_job(job, t, resource)
-                    job.is_backfilled = True
-                    job.occupied_range = [t, t + job.timestep_length]
-                    self.jobs_in_schedule.append(job)
-                    # スケジュールされたジョブをキューから削除
-                    job_queue.queue.remove(job)
-                    break  # このジョブの処理を終了
-
-    def _can_fit_job_in_timeslot(self, job: Job, start_timestep: int):
-        """指定されたタイムステップでジョブが実行可能かどうかを確認"""
-        job_pred_timesteps = np.ceil(job.pred_time / self.timestep_seconds).astype(int)
-        available_nodes = np.where(self.resource_map[:, start_timestep] == -1)[0]
-        if len(available_nodes) < job.node_size:
-            return False
-        # ジョブの実行時間がバックフィルウィンドウを超える場合
-        if job_pred_timesteps + start_timestep > self.backfill_timestep_window:
-            return False
-        if np.all(
-            self.resource_map[
-                available_nodes, start_timestep : start_timestep + job_pred_timesteps
-            ]
-            == -1
+            t = self._find_backfill_start_time(job)
+            if t is not None:
+                # ジョブをスケジュールに割り当てる
+                self._assign_job(job, t, resource)
+                job.is_backfilled = True
+                job.occupied_range = [t, t + job.timestep_length]
+                self.jobs_in_schedule[job.job_index] = job
+                # スケジュールされたジョブをキューから削除
+                job_queue.remove(job)
+
+    def _backfill_parallel(self, job_queue: JobQueue, resource: Resource):
+        """_backfill と同じ結果になる並列バックフィル
+
+        見えているジョブの形ごとに、現在のリソースマップでの開始タイムステップをスレッドプールで
+        まとめて求めておき、キューの順に割り当てる。割り当てたジョブと区間が重ならない開始タイムステップの
+        割り当て可否は変わらないので、割り当てのあとは重なる開始タイムステップだけを調べ直す。
+
+        速くなるのは探索が重く、コアが複数ある場合だけ。スレッドプールへの受け渡しと調べ直しの分だけ
+        処理は増えるので、1コアのマシンでは逐次より遅い（vectorized_search では1回のバックフィルが
+        逐次の 0.5 ms に対して 2～8 スレッドで 1.3 ms、行列の探索でも 1.3 倍ほど）。
+        """
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.backfill_workers)
+        visible_jobs = job_queue.head(self.watch_job_size)
+        # 探索で使うキャッシュはスレッドで共有する前に計算しておく
+        self.resource_map.prepare_search()
+        shapes = list(
+            dict.fromkeys((job.node_size, job.timestep_length) for job in visible_jobs)
+        )
+        start_times = dict(
+            zip(
+                shapes,
+                self._executor.map(
+                    lambda shape: self._backfill_start_time(*shape), shapes
+                ),
+            )
+        )
+        # このパスで割り当てた区間
+        assigned_ranges = []
+        for job in visible_jobs:
+            t = start_times[(job.node_size, job.timestep_length)]
+            if assigned_ranges:
+                t = self._revalidate_backfill_start_time(
+                    job.node_size, job.timestep_length, t, assigned_ranges
+                )
+            if t is None:
+                continue
+            self._assign_job(job, t, resource)
+            job.is_backfilled = True
+            job.occupied_range = [t, t + job.timestep_length]
+            self.jobs_in_schedule[job.job_index] = job
+            job_queue.remove(job)
+            assigned_ranges.append((t, t + job.timestep_length))
+
+    def _revalidate_backfill_start_time(
+        self, node_size: int, length: int, start_time, assigned_ranges
+    ):
+        """割り当て前のマップで求めた start_time を、割り当て後のマップでの結果に直す"""
+
+        def overlaps(t):
+            return any(start - length < t < end for start, end in assigned_ranges)
+
+        last_start = (
+            start_time
+            if start_time is not None
+            else self.backfill_timestep_window - length
+        )
+        # 区間が重なる開始タイムステップは割り当て可能になっているかもしれない
+        for t in self.resource_map.candidate_start_times(
+            node_size, length, self.backfill_timestep_window - 1
         ):
-            return True
-        return False  # 実行できるスペースがない
+            if t > last_start:
+                break
+            if overlaps(t) and self.resource_map.can_fit(node_size, t, length):
+                return int(t)
+        if start_time is None or not overlaps(start_time):
+            return start_time
+        # start_time が割り当て不可能になった場合はその後ろから探し直す
+        return self._backfill_start_time(node_size, length, start_time + 1)
 
-    def _find_earliest_start_time(self, job):
-        """Find the earliest timestep where the job can start, converting pred_time from seconds to timesteps."""
-        # ジョブのpred_timeをタイムステップに変換（秒をタイムステップに変換）
-        job_pred_timesteps = np.ceil(job.pred_time / self.timestep_seconds).astype(int)
+    def _find_backfill_start_time(self, job: Job):
+        """バックフィルウィンドウの中でジョブを割り当てられる最初のタイムステップを返す"""
+        if self.feasibility_cache is None:
+            return self._backfill_start_time(job.node_size, job.timestep_length)
+        return self.feasibility_cache.search(
+            "backfill",
+            job.node_size,
+            job.timestep_length,
+            self.backfill_timestep_window - job.timestep_length,
+            self.resource_map.version,
+            lambda lower_bound: self._backfill_start_time(
+                job.node_size, job.timestep_length, lower_bound
+            ),
+        )
+
+    def _backfill_start_time(self, node_size: int, length: int, lower_bound: int = 0):
+        """指定した形のジョブをバックフィルウィンドウの中で割り当てられる最初のタイムステップ
+
+        リソースマップを読むだけなので、複数のスレッドから同時に呼んでよい。
+        """
+        for t in self.resource_map.candidate_start_times(
+            node_size, length, self.backfill_timestep_window - 1
+        ):
+            if t < lower_bound:
+                continue
+            # ジョブの実行時間がバックフィルウィンドウを超える場合（以降の候補も超える）
+            if t + length > self.backfill_timestep_window:
+                break
+            if self.resource_map.can_fit(node_size, t, length):
+                return int(t)
+        return None
 
-        for t in range(self.timestep_window - job_pred_timesteps + 1):
-            # 各タイムステップで利用可能なノード数をカウント
-            available_nodes = np.where(self.resource_map[:, t] == -1)[0]
+    def _backfill_easy(self, job_queue: JobQueue, resource: Resource):
+        """EASYバックフィル
 
-            if len(available_nodes) < job.node_size:
-                # 必要なノード数が利用可能でない場合はスキップ
+        キューの先頭のジョブが開始できる最初のタイムステップ (shadow time) と、
+        そのときに先頭のジョブが使わずに余るノード数をスケジューリングごとに1回だけ求める。
+        残りのジョブは今すぐ開始でき、shadow time までに終わるか余るノードに収まる場合だけ割り当てる。
+        """
+        visible_jobs = job_queue.head(self.watch_job_size)
+        if not visible_jobs:
+            return
+        head_job = visible_jobs[0]
+        shadow_time, free_node_count = self._shadow_time(head_job)
+        extra_node_count = free_node_count - head_job.node_size
+
+        for job in visible_jobs[1:]:
+            if job.timestep_length > self.backfill_timestep_window:
+                continue
+            ends_before_shadow = job.timestep_length <= shadow_time
+            if not ends_before_shadow and job.node_size > extra_node_count:
                 continue
+            if not self._can_start_now(job):
+                continue
+            self._assign_job(job, 0, resource)
+            job.is_backfilled = True
+            job.occupied_range = [0, job.timestep_length]
+            self.jobs_in_schedule[job.job_index] = job
+            job_queue.remove(job)
+            if not ends_before_shadow:
+                extra_node_count -= job.node_size
+
+    def _shadow_time(self, head_job: Job):
+        """キューの先頭のジョブの shadow time と、そのときに空いているノード数を返す
+
+        先頭のジョブは FCFS でウィンドウの中に割り当てられなかったジョブなので、ふつうは
+        ウィンドウの末尾をはみ出して開始する。ウィンドウの後ろにはまだ予約がないので、
+        その場合はウィンドウの末尾まで空いているノードが node_size 以上になる最初のタイムステップとする。
+        """
+        shadow_time = self._find_earliest_start_time(head_job)
+        if shadow_time is not None:
+            free_node_count = len(
+                self.resource_map.select_nodes(
+                    self.node_size, shadow_time, head_job.timestep_length
+                )
+            )
+            return shadow_time, free_node_count
+
+        def free_until_end(t):
+            if t >= self.timestep_window:
+                return self.node_size
+            free_run_lengths = self.resource_map.free_run_lengths(t, None)
+            return int(np.count_nonzero(free_run_lengths >= self.timestep_window - t))
 
-            # 指定された期間にわたって、必要なノード数が連続して利用可能かチェック
-            consecutive_available = True
-            for dt in range(job_pred_timesteps):
-                if not all(self.resource_map[available_nodes, t + dt] == -1):
-                    consecutive_available = False
-                    break
+        # ウィンドウの末尾まで空いているノード数は t について単調増加なので二分探索する
+        low = max(self.timestep_window - head_job.timestep_length + 1, 0)
+        high = self.timestep_window
+        while low < high:
+            middle = (low + high) // 2
+            if free_until_end(middle) >= head_job.node_size:
+                high = middle
+            else:
+                low = middle + 1
+        return low, free_until_end(low)
 
-            if consecutive_available:
-                # すべての条件を満たす場合は、このタイムステップを返す
-                return t
+    def _can_start_now(self, job: Job):
+        """ジョブを先頭列から割り当てられるかどうか"""
+        if self.feasibility_cache is None:
+            return self.resource_map.can_fit(job.node_size, 0, job.timestep_length)
+        start = self.feasibility_cache.search(
+            "now",
+            job.node_size,
+            job.timestep_length,
+            0,
+            self.resource_map.version,
+            lambda lower_bound: (
+                0
+                if self.resource_map.can_fit(job.node_size, 0, job.timestep_length)
+                else None
+            ),
+        )
+        return start is not None
 
-        return None  # 適切な開始時間が見つからない場合
+    def _find_earliest_start_time(self, job):
+        """Find the earliest timestep where the job can start, converting pred_time from seconds to timesteps."""
+        # ジョブのpred_timeをタイムステップに変換（秒をタイムステップに変換）
+        job_pred_timesteps = np.ceil(job.pred_time / self.timestep_seconds).astype(int)
+        last_start = self.timestep_window - job_pred_timesteps
+        if self.feasibility_cache is None:
+            return self.resource_map.find_earliest_start_time(
+                job.node_size, job_pred_timesteps, last_start
+            )
+        return self.feasibility_cache.search(
+            "earliest",
+            job.node_size,
+            job_pred_timesteps,
+            last_start,
+            self.resource_map.version,
+            lambda lower_bound: self.resource_map.find_earliest_start_time(
+                job.node_size, job_pred_timesteps, last_start, lower_bound
+            ),
+        )
 
     def _assign_job(self, job, start_timestep, resource: Resource):
         """ジョブをスケジュールに割り当てる"""
@@ -201,24 +578,22 @@ class Schedule:
         job_pred_timesteps = np.ceil(job.pred_time / self.timestep_seconds).astype(int)
 
         # 必要なノード数が利用可能であり、かつ連続して利用可能なノードを探す
-        for node_index in range(self.node_size):
-            if np.all(
-                self.resource_map[
-                    node_index, start_timestep : start_timestep + job_pred_timesteps
-                ]
-                == -1
-            ):
-                # このノードをジョブの開始タイムステップからpred_timeの期間にわたって予約する
-                self.resource_map[
-                    node_index, start_timestep : start_timestep + job_pred_timesteps
-                ] = job.job_index
-                job.allocated_node_indecies.append(node_index)
-                job.allocated_nodes.append(resource.nodes[node_index])
-
-                # 必要なノード数が確保できたかチェック
-                if len(job.allocated_node_indecies) >= job.node_size:
-                    break
-        else:
+        node_indecies = self.allocation.select_nodes(
+            self.resource_map, job.node_size, start_timestep, job_pred_timesteps
+        )
+        # このノードをジョブの開始タイムステップからpred_timeの期間にわたって予約する
+        self.resource_map.reserve(
+            job.job_index,
+            node_indecies,
+            start_timestep,
+            start_timestep + job_pred_timesteps,
+        )
+        job.allocated_node_indecies = list(node_indecies)
+        for node_index in node_indecies:
+            job.allocated_nodes.append(resource.nodes[node_index])
+        if self.circular_time_axis:
+            self.uncompacted_jobs.append(job)
+        if len(node_indecies) < job.node_size:
             # 必要なノード数を満たすまでに利用可能なノードが見つからなかった場合の処理
             # この場合、ジョブはスケジュールされないか、異なるアプローチが必要
             print(job)
@@ -227,13 +602,142 @@ class Schedule:
     def _allocate_resources(self, resource: Resource, jobs: List[Job]):
         """リソースマップの先頭のジョブをリソースに割り当てる"""
         allocated_job_indecies = set()
-        for node_index, node in enumerate(resource.nodes):
-            job_index = self.resource_map[node_index, 0]
-            if (
-                node.state == NodeState.IDLE and job_index != -1
-            ):  # スケジュールにジョブが割り当てられている場合
-                job = jobs[job_index]
-                node.allocate_job(job)
-                job.start_timestep = self.timestep
-                allocated_job_indecies.add(job_index)
+        head_jobs = self.resource_map.head_jobs()
+        # アイドル中でスケジュールにジョブが割り当てられているノード
+        for node_index in np.flatnonzero(resource.idle_nodes() & (head_jobs != -1)):
+            node = resource.nodes[node_index]
+            job_index = head_jobs[node_index]
+            job = jobs[job_index]
+            node.allocate_job(job)
+            job.start_timestep = self.timestep
+            if job_index not in allocated_job_indecies:
+                completion_timestep = self.timestep + max(
+                    1, int(np.ceil(job.real_time / self.timestep_seconds))
+                )
+                heapq.heappush(self.completion_heap, (completion_timestep, job_index))
+            allocated_job_indecies.add(job_index)
         return len(allocated_job_indecies)
+
+    def skip_idle_timesteps(self, job_queue: JobQueue, resource: Resource):
+        """次のイベントの直前のタイムステップまで一括で進める
+
+        イベントはジョブの完了、リソースマップ上で待機しているジョブの開始、ジョブの投入、
+        キュー内のジョブが新たにスケジュール可能になることのいずれか。
+        その間のタイムステップでは proceed_timestep は前詰め以外に何もしないので、
+        リソースマップをまとめてシフトすることで同じ状態を得る。
+        スキップしたタイムステップ数を返す。
+        """
+        # numpy の整数のままだと self.timestep が np.int64 になるので int にする
+        skip = int(self._next_event_timestep(job_queue) - self.timestep - 1)
+        if skip <= 0:
+            return 0
+
+        # キューに入ったタイムステップを設定（スキップ後の最初のタイムステップで見えている）
+        job_queue.set_queued_timestep(self.timestep + 1, self.watch_job_size)
+
+        self._shift_unchanged(skip, resource)
+        self.timestep += skip
+        return skip
+
+    def _shift_unchanged(self, timesteps: int, resource: Resource):
+        """何も起きないタイムステップを進めたのと同じ状態にする"""
+        # 先頭列（実行中のジョブ）はそのまま、それ以降の列をtimesteps分だけ前にずらす
+        self.resource_map.shift(timesteps)
+        for job in self.jobs_in_schedule.values():
+            start, end = job.occupied_range
+            if job.start_timestep is not None:
+                # 実行中のジョブは予測実行時間を超過しても先頭列を占有し続ける
+                job.occupied_range = [0, max(end - timesteps, 1)]
+            elif start > 0:
+                job.occupied_range = [start - timesteps, end - timesteps]
+        resource.skip_timesteps(timesteps)
+
+    def _next_event_timestep(self, job_queue: JobQueue):
+        """次に proceed_timestep が何かを行う可能性のあるタイムステップを返す"""
+        next_timestep = self.timestep + 1
+
+        # 実行中のジョブの完了
+        while self.completion_heap and self.completion_heap[0][0] <= self.timestep:
+            heapq.heappop(self.completion_heap)
+        event_timestep = (
+            self.completion_heap[0][0] if self.completion_heap else np.iinfo(int).max
+        )
+
+        # リソースマップ上で待機しているジョブの開始
+        for job in self.jobs_in_schedule.values():
+            start = job.occupied_range[0]
+            if job.start_timestep is not None or start == 0:
+                continue
+            # 前詰めしきれていないジョブは次のタイムステップで1列より多く動く
+            if self.resource_map.is_free(job.allocated_node_indecies, start - 1):
+                return next_timestep
+            event_timestep = min(event_timestep, self.timestep + start)
+
+        # ジョブの投入
+        next_arrival_timestep = job_queue.next_arrival_timestep()
+        if next_arrival_timestep is not None:
+            event_timestep = min(event_timestep, next_arrival_timestep)
+        if event_timestep <= next_timestep:
+            return next_timestep
+
+        # キュー内のジョブのスケジュール
+        return min(event_timestep, self._next_placement_timestep(job_queue))
+
+    def _next_placement_timestep(self, job_queue: JobQueue):
+        """見えているジョブがFCFSまたはバックフィルで割り当て可能になる最初のタイムステップを返す
+
+        イベントが起きるまでの間、リソースマップは先頭列（実行中のジョブ）を除いて
+        1タイムステップごとに1列ずつ前にずれ、末尾には空き列が追加されるだけである。
+        そのため現在のリソースマップの列cは、kタイムステップ後の列c-kと同じ状態になる。
+        """
+        visible_jobs = job_queue.peek(self.watch_job_size)
+        if not visible_jobs:
+            return np.iinfo(int).max
+        for job in visible_jobs:
+            if (
+                job.node_size > self.node_size
+                or job.timestep_length > self.timestep_window
+            ):
+                # エラーは通常のタイムステップで投げる
+                return self.timestep + 1
+
+        available_counts, free_lengths = self.resource_map.column_capacity()
+
+        # 現在アイドルのノードが各列でビジーかどうか。先頭列に割り当てる場合に使う
+        idle_nodes = self.resource_map.free_nodes(0)
+        idle_busy = self.resource_map.busy_columns(np.where(idle_nodes)[0])
+        idle_next_busy = next_busy_timestep(idle_busy[np.newaxis, :])[0]
+        idle_next_busy = np.append(idle_next_busy, np.iinfo(np.int32).max)
+
+        event_step = self.timestep_window
+        for i, job in enumerate(visible_jobs):
+            # 先頭のジョブだけFCFSで、すべてのジョブがバックフィルで割り当てられうる
+            last_start = self.backfill_timestep_window - job.timestep_length
+            if i == 0:
+                last_start = max(last_start, self.timestep_window - job.timestep_length)
+            if last_start < 0:
+                continue
+
+            # 2列目以降に割り当てる場合
+            if last_start >= 1:
+                feasible = (available_counts[2:] >= job.node_size) & (
+                    free_lengths[2:] >= job.timestep_length
+                )
+                # ウィンドウ外の列は常に割り当て可能
+                column = (
+                    int(np.argmax(feasible)) + 2
+                    if feasible.any()
+                    else self.timestep_window
+                )
+                event_step = min(event_step, max(1, column - last_start))
+
+            # 先頭列に割り当てる場合
+            if np.count_nonzero(idle_nodes) >= job.node_size:
+                steps = np.arange(1, self.timestep_window)
+                feasible = idle_next_busy[steps + 1] >= steps + job.timestep_length
+                if feasible.any():
+                    event_step = min(event_step, int(np.argmax(feasible)) + 1)
+
+            if event_step == 1:
+                break
+        return self.timestep + event_step
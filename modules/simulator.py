@@ -1,13 +1,25 @@
+import json
+import os
+import pickle
+import time
 import numpy as np
 from tqdm import tqdm
 import sys
 from pathlib import Path
 
 sys.path.append(str(Path(__file__).parents[1]))
-from modules.job import Workload
+from modules.job import Workload, ArrayWorkload, StreamingWorkload
 from modules.job_queue import JobQueue
-from modules.resource import Resource
+from modules.resource import Resource, ArrayResource
 from modules.schedule import Schedule
+from modules.profiler import Profiler
+from modules.results import (
+    ParquetResultWriter,
+    job_results,
+    json_default,
+    write_metadata,
+    write_results,
+)
 
 
 class Simulator:
@@ -19,56 +31,252 @@ class Simulator:
         BACKFILL_TIMESTEP_WINDOW,
         WATCH_JOB_SIZE,
         TIMESTEP_SECONDS,
+        event_driven=False,
+        columnar_workload=False,
+        vectorized_resource=False,
+        profile=False,
+        profile_interval=None,
+        checkpoint_path=None,
+        checkpoint_interval=None,
+        checkpoint_seconds=None,
+        streaming=False,
+        result_writer=None,
+        total_jobs=None,
+        arrival=False,
+        result_path=None,
+        **schedule_options,
     ):
         self.NODE_SIZE = NODE_SIZE
         self.SCHEDULE_TIMESTEP_WINDOW = SCHEDULE_TIMESTEP_WINDOW
         self.BACKFILL_TIMESTEP_WINDOW = BACKFILL_TIMESTEP_WINDOW
         self.WATCH_JOB_SIZE = WATCH_JOB_SIZE
         self.TIMESTEP_SECONDS = TIMESTEP_SECONDS
-        self.workload = Workload(data, TIMESTEP_SECONDS)
-        self.job_queue = JobQueue(self.workload.jobs)
+        # 結果のメタデータに記録するパラメータ
+        self.parameters = {
+            "NODE_SIZE": NODE_SIZE,
+            "SCHEDULE_TIMESTEP_WINDOW": SCHEDULE_TIMESTEP_WINDOW,
+            "BACKFILL_TIMESTEP_WINDOW": BACKFILL_TIMESTEP_WINDOW,
+            "WATCH_JOB_SIZE": WATCH_JOB_SIZE,
+            "TIMESTEP_SECONDS": TIMESTEP_SECONDS,
+            "event_driven": event_driven,
+            "columnar_workload": columnar_workload,
+            "vectorized_resource": vectorized_resource,
+            "streaming": streaming,
+            "arrival": arrival,
+            **schedule_options,
+        }
+        # result_pathを指定すると、runの最後にジョブごとの結果をparquetに、
+        # 実行のメタデータ（パラメータ・実行時間・統計）を同じ名前の.jsonに書き出す
+        self.result_path = result_path
+        self.elapsed_seconds = 0.0
+        # Trueの場合、dataのsubmit_time列（秒）の時刻になるまでジョブをキューに入れない
+        self.arrival = arrival
+        if arrival and not streaming and "submit_time" not in data.columns:
+            raise ValueError("arrival requires a submit_time column")
+        # Trueの場合、dataはDataFrameのチャンクの列で、ジョブは見えるようになる前に読み込む
+        # 完了したジョブはresult_writerに書き出して捨てる
+        self.streaming = streaming
+        if streaming:
+            if columnar_workload:
+                raise ValueError("streaming does not support columnar_workload")
+            if checkpoint_path:
+                raise ValueError("streaming does not support checkpointing")
+            # ジョブごとの結果は完了したものから書き出す
+            if result_writer is None and result_path:
+                result_writer = ParquetResultWriter(result_path)
+            self.workload = StreamingWorkload(
+                data, TIMESTEP_SECONDS, writer=result_writer, total_jobs=total_jobs
+            )
+            # FCFSで割り当てた後にバックフィルで見るジョブまで読み込んでおく
+            self.job_queue = JobQueue(
+                [],
+                source=self.workload.read_jobs,
+                buffer_size=2 * WATCH_JOB_SIZE,
+                arrival=arrival,
+            )
+        # Trueの場合、ジョブの属性をNumPy配列で持つ
+        elif columnar_workload:
+            self.workload = ArrayWorkload(data, TIMESTEP_SECONDS)
+            self.job_queue = JobQueue(self.workload.jobs, arrival=arrival)
+        else:
+            self.workload = Workload(data, TIMESTEP_SECONDS)
+            self.job_queue = JobQueue(self.workload.jobs, arrival=arrival)
         self.schedule = Schedule(
             NODE_SIZE,
             SCHEDULE_TIMESTEP_WINDOW,
             BACKFILL_TIMESTEP_WINDOW,
             TIMESTEP_SECONDS,
             WATCH_JOB_SIZE,
+            **schedule_options,
         )
-        self.resource = Resource(node_size=NODE_SIZE, timestep_seconds=TIMESTEP_SECONDS)
+        # Trueの場合、ノードの状態をNumPy配列で持つ
+        if vectorized_resource:
+            self.resource = ArrayResource(
+                node_size=NODE_SIZE, timestep_seconds=TIMESTEP_SECONDS
+            )
+        else:
+            self.resource = Resource(
+                node_size=NODE_SIZE, timestep_seconds=TIMESTEP_SECONDS
+            )
+        # Trueの場合、何も起きないタイムステップを飛ばして次のイベントまで進める
+        self.event_driven = event_driven
+        # Trueの場合、フェーズごとの時間などを計測する
+        # profile_intervalを指定すると、そのタイムステップごとの累積値も記録する
+        self.profiler = None
+        if profile:
+            self.profiler = Profiler(profile_interval)
+            self.profiler.attach(self.schedule, self.resource)
+        # checkpoint_pathを指定すると、checkpoint_intervalタイムステップごと
+        # またはcheckpoint_seconds秒ごとにシミュレータの状態を保存する
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint_interval = checkpoint_interval
+        self.checkpoint_seconds = checkpoint_seconds
+        self.allocated_job_count = 0
 
-    def run(self, exp, method):
-        with open(f'exp{exp}-method{method}-progress.txt', 'w') as f:
-            pbar = tqdm(total=len(self.workload.jobs), file=f)
+    def save_checkpoint(self, path):
+        """シミュレータの状態を丸ごと保存する（書き込み中に止まっても前回の保存は残る）"""
+        # 計測用のラッパーは保存できないので一時的に外す
+        if self.profiler:
+            self.profiler.detach()
+        try:
+            with open(f"{path}.tmp", "wb") as f:
+                pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(f"{path}.tmp", path)
+        finally:
+            if self.profiler:
+                self.profiler.attach(self.schedule, self.resource)
 
-            # Create initial schedule
-            allocated_job_count = self.schedule.create_initial_schedule(
-                self.job_queue, self.resource, self.workload.jobs
-            )
-            pbar.update(allocated_job_count)
+    @staticmethod
+    def load_checkpoint(path):
+        with open(path, "rb") as f:
+            simulator = pickle.load(f)
+        if simulator.profiler:
+            simulator.profiler.attach(simulator.schedule, simulator.resource)
+        return simulator
+
+    def run(self, exp, method, resume=False, progress_path=None):
+        """シミュレーションを行う。resume=Trueの場合はチェックポイントの状態から続ける
+
+        進捗は progress_path（省略した場合はカレントディレクトリの
+        exp{exp}-method{method}-progress.txt）に書き出す。
+        """
+        if progress_path is None:
+            progress_path = f"exp{exp}-method{method}-progress.txt"
+        with open(progress_path, "w") as f:
+            if self.streaming:
+                pbar = tqdm(total=self.workload.total_jobs, file=f)
+            else:
+                pbar = tqdm(total=len(self.workload), file=f)
+
+            if not resume:
+                # Create initial schedule
+                self.allocated_job_count = self.schedule.create_initial_schedule(
+                    self.job_queue, self.resource, self.workload.jobs
+                )
+            pbar.update(self.allocated_job_count)
             f.flush()
 
+            last_checkpoint_timestep = self.schedule.timestep
+            last_checkpoint_time = time.time()
+            run_start_time = time.time()
+
             last_showed_progress = 0
             while not self.job_queue.is_empty() or self.resource.is_running():
+                if self.event_driven:
+                    self.schedule.skip_idle_timesteps(self.job_queue, self.resource)
                 allocated_job_count = self.schedule.proceed_timestep(
                     self.job_queue, self.resource, self.workload.jobs
                 )
+                self.allocated_job_count += allocated_job_count
+                if self.streaming:
+                    self.workload.complete_jobs(self.schedule.completed_jobs)
                 pbar.update(allocated_job_count)
-                progress = np.ceil(pbar.n / pbar.total * 100)
+                # 全体のジョブ数が分からない場合は割合の代わりに割り当てたジョブ数で数える
+                if pbar.total:
+                    progress = np.ceil(pbar.n / pbar.total * 100)
+                else:
+                    progress = pbar.n // 1000
                 if progress - last_showed_progress >= 1:
                     f.flush()
                     last_showed_progress = progress
 
+                if self.checkpoint_path and (
+                    (
+                        self.checkpoint_interval
+                        and self.schedule.timestep - last_checkpoint_timestep
+                        >= self.checkpoint_interval
+                    )
+                    or (
+                        self.checkpoint_seconds
+                        and time.time() - last_checkpoint_time
+                        >= self.checkpoint_seconds
+                    )
+                ):
+                    self.elapsed_seconds += time.time() - run_start_time
+                    run_start_time = time.time()
+                    self.save_checkpoint(self.checkpoint_path)
+                    last_checkpoint_timestep = self.schedule.timestep
+                    last_checkpoint_time = time.time()
+
             pbar.close()
+            self.elapsed_seconds += time.time() - run_start_time
+
+        if self.streaming and self.workload.writer is not None:
+            self.workload.writer.close()
 
         # Show statics
-        total_time = self.schedule.total_time()
-        total_jobs = len(self.workload.jobs)
-        avg_wall_time = self.workload.get_avg_wall_time()
-        backfill_ratio = self.workload.get_backfill_ratio()
-        job_throughput = total_jobs / (total_time / 3600)
-
-        print(f"Total time: {total_time/3600:.2f} hours")
-        print(f"Average wall time: {avg_wall_time/3600:.2f} hours")
-        print(f"Job throughput: {job_throughput:.2f} jobs/hour")
-        print(f"Backfill ratio: {backfill_ratio:.2f}")
+        statistics = self.get_statistics()
+        print(f"Total time: {statistics['total_time']/3600:.2f} hours")
+        print(f"Average wall time: {statistics['avg_wall_time']/3600:.2f} hours")
+        print(f"Job throughput: {statistics['job_throughput']:.2f} jobs/hour")
+        print(f"Backfill ratio: {statistics['backfill_ratio']:.2f}")
+        if self.arrival:
+            print(f"Average wait time: {statistics['avg_wait_time']/3600:.2f} hours")
         print("\n")
+
+        if self.result_path:
+            self.export_results(self.result_path, statistics)
+
+        if self.profiler:
+            self.profiler.print_summary()
+            print("\n")
+            with open(f"exp{exp}-method{method}-profile.json", "w") as f:
+                json.dump(
+                    {
+                        "summary": self.profiler.summary(),
+                        "series": self.profiler.series,
+                    },
+                    f,
+                    indent=2,
+                    default=json_default,
+                )
+
+    def export_results(self, path, statistics=None):
+        """ジョブごとの結果をparquetに、実行のメタデータを同じ名前の.jsonに書き出す
+
+        ストリーミングの場合、ジョブごとの結果は実行中にresult_writerで書き出しているので
+        メタデータだけを書き出す。
+        """
+        metadata = {
+            "parameters": self.parameters,
+            "elapsed_seconds": self.elapsed_seconds,
+            "job_count": len(self.workload),
+            "statistics": statistics or self.get_statistics(),
+        }
+        if self.streaming:
+            write_metadata(path, metadata)
+        else:
+            write_results(path, job_results(self.workload), metadata)
+
+    def get_statistics(self):
+        total_time = self.schedule.total_time()
+        total_jobs = len(self.workload)
+        statistics = {
+            "total_time": total_time,
+            "avg_wall_time": self.workload.get_avg_wall_time(),
+            "job_throughput": total_jobs / (total_time / 3600),
+            "backfill_ratio": self.workload.get_backfill_ratio(),
+        }
+        if self.arrival:
+            statistics["avg_wait_time"] = self.workload.get_avg_wait_time()
+        return statistics
@@ -0,0 +1,174 @@
+import contextlib
+import itertools
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Dict, List
+import numpy as np
+import pandas as pd
+from modules.dataset import select_jobs
+from modules.simulator import Simulator
+
+# ワーカープロセスで共有メモリから復元した配列
+_shared_arrays: Dict[str, np.ndarray] = {}
+_shared_memories: List[shared_memory.SharedMemory] = []
+
+
+def make_grid(
+    methods: List[int],
+    seeds: List[int],
+    node_sizes: List[int],
+    timestep_windows: List[int],
+    backfill_timestep_windows: List[int],
+    watch_job_sizes: List[int],
+) -> List[dict]:
+    """パラメータの組み合わせを列挙する（バックフィルウィンドウがスケジュールウィンドウを超えるものは除く）"""
+    return [
+        {
+            "method": method,
+            "seed": seed,
+            "node_size": node_size,
+            "timestep_window": timestep_window,
+            "backfill_timestep_window": backfill_timestep_window,
+            "watch_job_size": watch_job_size,
+        }
+        for (
+            node_size,
+            timestep_window,
+            backfill_timestep_window,
+            watch_job_size,
+            seed,
+            method,
+        ) in itertools.product(
+            node_sizes,
+            timestep_windows,
+            backfill_timestep_windows,
+            watch_job_sizes,
+            seeds,
+            methods,
+        )
+        if backfill_timestep_window <= timestep_window
+    ]
+
+
+def run_sweep(
+    arrays: Dict[str, np.ndarray],
+    grid: List[dict],
+    timestep_seconds: int,
+    sample_size: int,
+    processes: int = 1,
+    method_names: List[str] | None = None,
+    progress_dir: str | None = None,
+    **simulator_options,
+) -> pd.DataFrame:
+    """グリッドのすべての組み合わせでシミュレーションを行い、結果を1つの表にまとめる
+
+    processes > 1 の場合はプロセスプールで並列に実行する。
+    ジョブの配列は共有メモリに置き、各ワーカーはそれを参照する。
+    各実行の進捗は progress_dir に書き出す（省略した場合は一時ディレクトリ）。
+    """
+    # 進捗ファイルは progress_dir を省略した場合は一時ディレクトリに書き出して捨てる
+    with (
+        contextlib.nullcontext(progress_dir)
+        if progress_dir is not None
+        else tempfile.TemporaryDirectory()
+    ) as progress_dir:
+        tasks = [
+            (
+                run_index,
+                params,
+                timestep_seconds,
+                sample_size,
+                progress_dir,
+                simulator_options,
+            )
+            for run_index, params in enumerate(grid)
+        ]
+        if processes <= 1:
+            _attach_arrays_locally(arrays)
+            results = [_run_task(task) for task in tasks]
+        else:
+            memories = []
+            try:
+                descriptors = {}
+                for key, array in arrays.items():
+                    memory = shared_memory.SharedMemory(
+                        create=True, size=max(array.nbytes, 1)
+                    )
+                    memories.append(memory)
+                    np.ndarray(array.shape, array.dtype, buffer=memory.buf)[...] = array
+                    descriptors[key] = (memory.name, array.shape, array.dtype.str)
+                with ProcessPoolExecutor(
+                    max_workers=processes,
+                    initializer=_attach_shared_arrays,
+                    initargs=(descriptors,),
+                ) as executor:
+                    results = list(executor.map(_run_task, tasks))
+            finally:
+                for memory in memories:
+                    memory.close()
+                    memory.unlink()
+
+    results = pd.DataFrame(results)
+    if method_names is not None:
+        results.insert(1, "method_name", [method_names[m] for m in results["method"]])
+    return results
+
+
+def _attach_arrays_locally(arrays: Dict[str, np.ndarray]):
+    _shared_arrays.clear()
+    _shared_arrays.update(arrays)
+
+
+def _attach_shared_arrays(descriptors: Dict[str, tuple]):
+    """ワーカープロセスの初期化時に共有メモリ上の配列を参照する"""
+    for key, (name, shape, dtype) in descriptors.items():
+        memory = shared_memory.SharedMemory(name=name)
+        _shared_memories.append(memory)
+        _shared_arrays[key] = np.ndarray(shape, np.dtype(dtype), buffer=memory.buf)
+
+
+def _run_task(task):
+    (
+        run_index,
+        params,
+        timestep_seconds,
+        sample_size,
+        progress_dir,
+        simulator_options,
+    ) = task
+    start_time = time.time()
+    df = select_jobs(
+        _shared_arrays,
+        params["method"],
+        params["node_size"],
+        params["timestep_window"],
+        timestep_seconds,
+        sample_size,
+        params["seed"],
+    )
+    simulator = Simulator(
+        df,
+        params["node_size"],
+        params["timestep_window"],
+        params["backfill_timestep_window"],
+        params["watch_job_size"],
+        timestep_seconds,
+        **simulator_options,
+    )
+    exp = f"-sweep{run_index}"
+    simulator.run(
+        exp,
+        params["method"],
+        progress_path=os.path.join(
+            progress_dir, f"exp{exp}-method{params['method']}-progress.txt"
+        ),
+    )
+    return {
+        "run_index": run_index,
+        **params,
+        **simulator.get_statistics(),
+        "elapsed_seconds": time.time() - start_time,
+    }
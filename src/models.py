@@ -2,9 +2,11 @@ from functools import partial
 from typing import List
 from enum import Enum
 import copy
+import heapq
 import sys
 import multiprocessing
 
+from start_time_prediction import predict_start_times
 from utils import formatted_time
 
 DEBUG = 1
@@ -44,21 +46,69 @@ class Node:
         self.job_id = -1
 
 
+class NodePool:
+    """空きノード数・空きノードのヒープ・ジョブごとの開放時間のヒープでノードを管理する
+
+    空きノード数の確認はO(1)、k個のノードの確保はO(k log N)、次の開放時間の取得はO(1)、
+    開放はO(k log N)で行える。空きノードは番号の小さい順に確保するので、
+    JobScheduler のノードの線形探索と同じノードが選ばれる。
+    """
+
+    def __init__(self, nodes: List[Node]):
+        self.nodes = nodes
+        self.free_count = len(nodes)
+        self.free_heap = list(range(len(nodes)))
+        # (time_to_be_avail, 通し番号, ノード番号のリスト)
+        self.release_heap = []
+        self.release_count = 0
+
+    def take(self, nodes_needed, time_to_be_avail) -> List[int]:
+        node_indices = [heapq.heappop(self.free_heap) for _ in range(nodes_needed)]
+        self.free_count -= nodes_needed
+        heapq.heappush(
+            self.release_heap, (time_to_be_avail, self.release_count, node_indices)
+        )
+        self.release_count += 1
+        return node_indices
+
+    def min_time_to_be_avail(self):
+        return self.release_heap[0][0] if self.release_heap else sys.maxsize
+
+    def release(self, time):
+        """time_to_be_avail が time のノードを開放する"""
+        while self.release_heap and self.release_heap[0][0] == time:
+            for node_index in heapq.heappop(self.release_heap)[2]:
+                node = self.nodes[node_index]
+                node.avail = True
+                node.job_id = -1
+                heapq.heappush(self.free_heap, node_index)
+                self.free_count += 1
+
+
 class JobScheduler:
-    def __init__(self, nodes_count, job_data):
+    def __init__(self, nodes_count, job_data, node_pool=True):
         self.job_data: List[Job] = job_data
         self.nodes: List[Node] = [Node() for _ in range(nodes_count)]
         self.time = 0
+        # node_pool=Trueの場合、ノードの線形探索の代わりに NodePool のヒープを使う（結果は同じ）
+        self.use_node_pool = node_pool
+        self.node_pool = NodePool(self.nodes) if node_pool else None
 
     def reset(self):
         self.time = 0
         self.nodes = [Node() for _ in range(len(self.nodes))]
+        if self.use_node_pool:
+            self.node_pool = NodePool(self.nodes)
 
-    def run(self):
+    def run(self, snapshot=True):
         # 実際のジョブの開始時間を計算
         self.schedule(SchedTimeType.ACT, self.job_data)
         print("actual job start time calculated")
         # 各ジョブについて、スケジュールされた開始時刻と予測した開始時刻を計算
+        # snapshot=Trueの場合、投入時刻の状態のスナップショットから計算する（結果は同じ）
+        if snapshot:
+            self.job_data = predict_start_times(self.job_data, len(self.nodes))
+            return
         with multiprocessing.Pool(processes=8) as p:
             partial_calc_start_time = partial(
                 self.calc_start_time, job_data=self.job_data
@@ -172,6 +222,8 @@ class JobScheduler:
 
     # ジョブがノードに割り当て可能かどうかをチェックする
     def check_nodes(self, nodes_needed):
+        if self.node_pool is not None:
+            return self.node_pool.free_count >= nodes_needed
         # 各ノードに割り当てられているジョブを表示
         avail_nodes_count = 0
         for node in self.nodes:
@@ -180,17 +232,22 @@ class JobScheduler:
         return avail_nodes_count >= nodes_needed
 
     def assign_job(self, job: Job, sched_time: SchedTimeType):
-        node_indices = self.get_avail_node_index(job.node_amount)
+        if sched_time == SchedTimeType.ACT:
+            lapse_runtime = job.act_runtime
+        elif sched_time == SchedTimeType.SCHED:
+            lapse_runtime = job.req_runtime
+        elif sched_time == SchedTimeType.PRED:
+            lapse_runtime = job.pred_runtime
+        if self.node_pool is not None:
+            node_indices = self.node_pool.take(
+                job.node_amount, self.time + lapse_runtime
+            )
+        else:
+            node_indices = self.get_avail_node_index(job.node_amount)
         # ノードの利用状況を更新
         for node_index in node_indices:
             self.nodes[node_index].avail = False
             self.nodes[node_index].job_id = job.id
-            if sched_time == SchedTimeType.ACT:
-                lapse_runtime = job.act_runtime
-            elif sched_time == SchedTimeType.SCHED:
-                lapse_runtime = job.req_runtime
-            elif sched_time == SchedTimeType.PRED:
-                lapse_runtime = job.pred_runtime
             self.nodes[node_index].time_to_be_avail = self.time + lapse_runtime
         # ジョブの開始時間を記録
         if sched_time == SchedTimeType.ACT:
@@ -209,6 +266,9 @@ class JobScheduler:
         return avail_nodes[:nodes_needed]
 
     def update_nodes(self):
+        if self.node_pool is not None:
+            self.node_pool.release(self.time)
+            return
         for node in self.nodes:
             if node.time_to_be_avail == self.time:
                 node.avail = True
@@ -216,6 +276,8 @@ class JobScheduler:
 
     # 現在使用中のノードの中で最も早く空きができるノードの開放時間を返す
     def get_min_time_to_be_avail(self):
+        if self.node_pool is not None:
+            return self.node_pool.min_time_to_be_avail() - self.time
         min_time = sys.maxsize
         for node in self.nodes:
             if not node.avail and node.time_to_be_avail < min_time:
@@ -0,0 +1,159 @@
+import heapq
+import multiprocessing
+from typing import List
+
+import numpy as np
+
+# ワーカーで共有するジョブの属性（変更しない）
+job_arrays = {}
+
+
+def init_worker(arrays, nodes_count):
+    job_arrays.update(arrays)
+    job_arrays["nodes_count"] = nodes_count
+
+
+def take_snapshots(start_time_act, act_runtime, submitted_time):
+    """投入時刻ごとに実行中のジョブとキューの先頭を求める
+
+    実際の開始時刻はジョブの順に単調増加なので、投入時刻 s のキューは開始時刻が s 以上の
+    連続したジョブ [queue_start, job_index] になる（s までに終了したジョブは predict で除く）。
+    実行中のジョブは投入時刻の順に走査しながら開始・終了したジョブを出し入れして求める。
+    """
+    order = np.argsort(submitted_time, kind="stable")
+    running = set()
+    end_heap = []
+    next_start = 0
+    snapshots = []
+    for job_index in order:
+        s = submitted_time[job_index]
+        if s < 0:
+            continue
+        while next_start < len(start_time_act) and start_time_act[next_start] < s:
+            running.add(next_start)
+            heapq.heappush(
+                end_heap,
+                (start_time_act[next_start] + act_runtime[next_start], next_start),
+            )
+            next_start += 1
+        while end_heap and end_heap[0][0] <= s:
+            running.discard(heapq.heappop(end_heap)[1])
+        queue_start = int(np.searchsorted(start_time_act, s, side="left"))
+        snapshots.append(
+            (
+                int(job_index),
+                int(s),
+                np.fromiter(running, dtype=np.int64, count=len(running)),
+                queue_start,
+            )
+        )
+    return snapshots
+
+
+def simulate(base_time, release_times, release_nodes, queue, runtimes, node_amount):
+    """実行中のジョブ（終了時刻とノード数）から始めてキューのジョブを順に FCFS で割り当て、
+    最後に割り当てたジョブの開始時刻を返す"""
+    nodes_count = job_arrays["nodes_count"]
+    time = base_time
+    heap = list(zip(release_times.tolist(), release_nodes.tolist()))
+    heapq.heapify(heap)
+    free_nodes = nodes_count - int(release_nodes.sum())
+    for job_index in queue:
+        while free_nodes < node_amount[job_index]:
+            time = heap[0][0]
+            while heap and heap[0][0] == time:
+                free_nodes += heapq.heappop(heap)[1]
+        free_nodes -= node_amount[job_index]
+        heapq.heappush(heap, (time + runtimes[job_index], node_amount[job_index]))
+    return int(time)
+
+
+def predict(snapshot):
+    """スナップショットから、スケジュールされた開始時刻と予測した開始時刻を求める"""
+    job_index, s, running, queue_start = snapshot
+    start_time_act = job_arrays["start_time_act"]
+    end_time_act = job_arrays["end_time_act"]
+    node_amount = job_arrays["node_amount"]
+    req_runtime = job_arrays["req_runtime"]
+    pred_runtime = job_arrays["pred_runtime"]
+    # calc_start_time と同じく、s までに終了したジョブ（s に開始した実行時間0のジョブ）は除く。
+    # 対象のジョブ自体が除かれる場合、JobScheduler.schedule は0を返す
+    if end_time_act[job_index] <= s:
+        return job_index, 0, 0
+    queue = np.arange(queue_start, job_index + 1)
+    queue = queue[end_time_act[queue] > s]
+    # 実行中のジョブは投入時刻からの残り実行時間だけノードを使う
+    running_nodes = node_amount[running]
+    start_time_sched = simulate(
+        s,
+        start_time_act[running] + req_runtime[running],
+        running_nodes,
+        queue,
+        req_runtime,
+        node_amount,
+    )
+    # 予測実行時間が0以下のジョブは割り当てられないので、JobScheduler.schedule と同じく0とする
+    if pred_runtime[job_index] <= 0:
+        return job_index, start_time_sched, 0
+    # 予測実行時間を超えて実行中のジョブ・予測実行時間が0以下のジョブは除く
+    pred_release_times = start_time_act[running] + pred_runtime[running]
+    still_running = pred_release_times > s
+    pred_queue = queue[pred_runtime[queue] > 0]
+    start_time_pred = simulate(
+        s,
+        pred_release_times[still_running],
+        running_nodes[still_running],
+        pred_queue,
+        pred_runtime,
+        node_amount,
+    )
+    return job_index, start_time_sched, start_time_pred
+
+
+def predict_start_times(job_data: List, nodes_count: int, processes: int = 8):
+    """JobScheduler.calc_start_time と同じ開始時刻を、ジョブ全体をコピーせずに求める
+
+    job_data は実際の開始時刻 (start_time_act) を計算済みであること。
+    投入時刻が負のジョブは除いたリストを返す。
+    """
+    arrays = {
+        "node_amount": np.array([job.node_amount for job in job_data], dtype=np.int64),
+        "req_runtime": np.array([job.req_runtime for job in job_data], dtype=np.int64),
+        "pred_runtime": np.array(
+            [job.pred_runtime for job in job_data], dtype=np.int64
+        ),
+        "start_time_act": np.array(
+            [job.start_time_act for job in job_data], dtype=np.int64
+        ),
+    }
+    act_runtime = np.array([job.act_runtime for job in job_data], dtype=np.int64)
+    arrays["end_time_act"] = arrays["start_time_act"] + act_runtime
+    submitted_time = arrays["start_time_act"] - np.array(
+        [job.submitted_time_offset for job in job_data], dtype=np.int64
+    )
+    if np.any(np.diff(arrays["start_time_act"]) < 0):
+        raise ValueError("start_time_act must be non-decreasing in job order")
+    snapshots = take_snapshots(arrays["start_time_act"], act_runtime, submitted_time)
+
+    if processes > 1:
+        with multiprocessing.Pool(
+            processes=processes,
+            initializer=init_worker,
+            initargs=(arrays, nodes_count),
+        ) as p:
+            results = p.map(
+                predict, snapshots, chunksize=max(len(snapshots) // processes // 4, 1)
+            )
+    else:
+        init_worker(arrays, nodes_count)
+        results = map(predict, snapshots)
+
+    predicted_jobs = []
+    for job_index, start_time_sched, start_time_pred in sorted(results):
+        job = job_data[job_index]
+        job.start_time_sched = start_time_sched
+        job.start_time_pred = start_time_pred
+        predicted_jobs.append(job)
+    for job_index in np.where(submitted_time < 0)[0]:
+        print("job %s is skipped" % job_data[job_index].id)
+    return predicted_jobs
@@ -0,0 +1,82 @@
+import argparse
+import time
+from modules.dataset import DATA_LIST, load_common_jobs
+from modules.allocation import ALLOCATION_STRATEGIES
+from modules.schedule import BACKFILL_POLICIES
+from modules.sweep import make_grid, run_sweep
+
+start_time = time.time()
+
+parser = argparse.ArgumentParser(
+    description="手法・パラメータの組み合わせごとのシミュレーションをまとめて実行する"
+)
+parser.add_argument("--methods", type=int, nargs="+", default=[0, 1, 2, 3])
+parser.add_argument("--seeds", type=int, nargs="+", default=[0])
+parser.add_argument("--node-size", type=int, nargs="+", default=[1000])
+parser.add_argument("--timestep-window", type=int, nargs="+", default=[1440])
+parser.add_argument("--backfill-timestep-window", type=int, nargs="+", default=[720])
+parser.add_argument("--watch-job-size", type=int, nargs="+", default=[200])
+parser.add_argument("--timestep-seconds", type=int, default=60)
+parser.add_argument("--sample-size", type=int, default=10000)
+parser.add_argument("--processes", type=int, default=1)
+parser.add_argument("--event-driven", action="store_true")
+parser.add_argument("--columnar-workload", action="store_true")
+parser.add_argument("--vectorized-resource", action="store_true")
+parser.add_argument(
+    "--backfill-policy", default="conservative", choices=BACKFILL_POLICIES
+)
+parser.add_argument("--skip-unchanged", action="store_true")
+parser.add_argument("--feasibility-cache", action="store_true")
+parser.add_argument("--backfill-workers", type=int, default=1)
+parser.add_argument(
+    "--allocation-strategy", default="first_fit", choices=list(ALLOCATION_STRATEGIES)
+)
+parser.add_argument("--rack-size", type=int, default=32)
+parser.add_argument("--packed-free-mask", action="store_true")
+parser.add_argument("--output", default="sweep-results.csv")
+# 省略した場合、各実行の進捗ファイルは一時ディレクトリに書き出して捨てる
+parser.add_argument("--progress-dir")
+args = parser.parse_args()
+
+grid = make_grid(
+    args.methods,
+    args.seeds,
+    args.node_size,
+    args.timestep_window,
+    args.backfill_timestep_window,
+    args.watch_job_size,
+)
+
+print("*** Sweep ***")
+print(f"Methods: {[DATA_LIST[method]['name'] for method in args.methods]}")
+print(f"Seeds: {args.seeds}")
+print(f"Runs: {len(grid)}")
+print(f"Processes: {args.processes}")
+print("\n")
+
+# データの読み込みと結合は1回だけ行い、結果は data/cache に保存しておく
+arrays = load_common_jobs(DATA_LIST)
+results = run_sweep(
+    arrays,
+    grid,
+    args.timestep_seconds,
+    args.sample_size,
+    processes=args.processes,
+    method_names=[data["name"] for data in DATA_LIST],
+    event_driven=args.event_driven,
+    columnar_workload=args.columnar_workload,
+    vectorized_resource=args.vectorized_resource,
+    backfill_policy=args.backfill_policy,
+    skip_unchanged=args.skip_unchanged,
+    feasibility_cache=args.feasibility_cache,
+    backfill_workers=args.backfill_workers,
+    allocation_strategy=args.allocation_strategy,
+    rack_size=args.rack_size,
+    packed_free_mask=args.packed_free_mask,
+    progress_dir=args.progress_dir,
+)
+results.to_csv(args.output, index=False)
+print(results)
+
+end_time = time.time()
+print(f"Elapsed time: {(end_time - start_time)/3600:.2f} hours")
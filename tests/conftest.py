@@ -0,0 +1,33 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# modules（新しいシミュレータ）はリポジトリのルートから、src（古いシミュレータ）は
+# src ディレクトリから import する
+ROOT = Path(__file__).resolve().parent.parent
+for path in (ROOT, ROOT / "src"):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+
+@pytest.fixture
+def make_data():
+    """Simulator に渡す合成ジョブデータ（log_id, y_true, y_pred, ehost_num）を作る"""
+
+    def make(job_count, max_nodes, max_timesteps, seed=0, timestep_seconds=60):
+        rng = np.random.default_rng(seed)
+        pred_time = rng.integers(1, max_timesteps * timestep_seconds, job_count)
+        real_time = np.maximum(1, pred_time * rng.lognormal(0, 0.6, job_count))
+        return pd.DataFrame(
+            {
+                "log_id": np.arange(job_count),
+                "y_true": real_time.astype(int),
+                "y_pred": pred_time.astype(float),
+                "ehost_num": rng.integers(1, max_nodes + 1, job_count),
+            }
+        )
+
+    return make
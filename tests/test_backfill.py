@@ -0,0 +1,73 @@
+import pandas as pd
+import pytest
+
+from modules.simulator import Simulator
+
+
+def run_policy(node_counts, timesteps, tmp_path, monkeypatch, **options):
+    """4ノード・ウィンドウ10タイムステップで、予測どおりに終わるジョブを実行する"""
+    monkeypatch.chdir(tmp_path)
+    seconds = [timestep * 60 for timestep in timesteps]
+    data = pd.DataFrame(
+        {
+            "log_id": range(len(seconds)),
+            "y_true": seconds,
+            "y_pred": [float(second) for second in seconds],
+            "ehost_num": node_counts,
+        }
+    )
+    simulator = Simulator(data, 4, 10, 10, 3, 60, **options)
+    simulator.run(0, 0)
+    return [(job.start_timestep, job.is_backfilled) for job in simulator.workload.jobs]
+
+
+def test_easy_does_not_delay_head_job(tmp_path, monkeypatch):
+    # ジョブ1はウィンドウに収まらないのでキューの先頭に残り、タイムステップ6に開始できる
+    node_counts, timesteps = [3, 4, 1], [6, 8, 9]
+    # conservative はジョブ2を今すぐ開始し、ジョブ1はジョブ2の終了まで遅れる
+    assert run_policy(node_counts, timesteps, tmp_path, monkeypatch) == [
+        (0, False),
+        (9, False),
+        (0, True),
+    ]
+    # EASY ではジョブ2は shadow time (6) までに終わらず、余るノードもないので待つ
+    assert run_policy(
+        node_counts, timesteps, tmp_path, monkeypatch, backfill_policy="easy"
+    ) == [(0, False), (6, False), (14, False)]
+
+
+def test_easy_backfills_into_extra_nodes(tmp_path, monkeypatch):
+    # ジョブ1は3ノードしか使わないので、shadow time に余るノードでジョブ2を開始できる
+    assert run_policy(
+        [3, 3, 1], [6, 8, 9], tmp_path, monkeypatch, backfill_policy="easy"
+    ) == [(0, False), (6, False), (0, True)]
+
+
+@pytest.mark.parametrize(
+    "options", [{}, {"vectorized_search": True}], ids=["dense", "vectorized"]
+)
+@pytest.mark.parametrize("seed", range(3))
+def test_parallel_backfill_matches_serial(
+    options, seed, make_data, tmp_path, monkeypatch
+):
+    monkeypatch.chdir(tmp_path)
+    data = make_data(200, 10, 35, seed=seed)
+    results = []
+    for backfill_workers in [1, 4]:
+        simulator = Simulator(
+            data, 16, 60, 40, 8, 60, backfill_workers=backfill_workers, **options
+        )
+        simulator.run(0, backfill_workers)
+        results.append(
+            [
+                (
+                    job.start_timestep,
+                    job.is_backfilled,
+                    [int(node_index) for node_index in job.allocated_node_indecies],
+                )
+                for job in simulator.workload.jobs
+            ]
+        )
+    serial, parallel = results
+    assert any(is_backfilled for _, is_backfilled, _ in serial)
+    assert parallel == serial
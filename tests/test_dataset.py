@@ -0,0 +1,23 @@
+import os
+
+from modules.dataset import cache_key
+
+
+def test_cache_key_follows_size_and_mtime(tmp_path):
+    path = tmp_path / "jobs.parquet"
+    path.write_bytes(b"jobs")
+    data_list = [{"name": "jobs", "path": str(path)}]
+    key = cache_key(data_list, seed=0)
+    assert cache_key(data_list, seed=0) == key
+    assert cache_key(data_list, seed=1) != key
+
+    # 同じサイズでも更新時刻が変わればキーが変わる
+    stat = os.stat(path)
+    path.write_bytes(b"JOBS")
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+    touched_key = cache_key(data_list, seed=0)
+    assert touched_key != key
+
+    path.write_bytes(b"more jobs")
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+    assert cache_key(data_list, seed=0) not in (key, touched_key)
@@ -0,0 +1,60 @@
+from types import SimpleNamespace
+
+import pytest
+
+from modules.schedule import Schedule
+
+TIMESTEP_SECONDS = 60
+
+BACKENDS = {
+    "dense": {"compiled_kernels": False},
+    "packed": {"packed_free_mask": True},
+    "vectorized": {"vectorized_search": True},
+    "circular": {"circular_time_axis": True},
+    "profile": {"resource_map_backend": "profile"},
+}
+
+
+def job(node_size, timesteps):
+    return SimpleNamespace(node_size=node_size, pred_time=timesteps * TIMESTEP_SECONDS)
+
+
+@pytest.fixture(params=list(BACKENDS))
+def schedule(request):
+    schedule = Schedule(
+        4,
+        12,
+        10,
+        TIMESTEP_SECONDS,
+        3,
+        feasibility_cache=True,
+        **BACKENDS[request.param]
+    )
+    # 0-3 はすべてのノード、3-6 はノード0と1が埋まっている
+    schedule.resource_map.reserve(0, [0, 1, 2, 3], 0, 3)
+    schedule.resource_map.reserve(1, [0, 1], 3, 6)
+    return schedule
+
+
+def test_lower_bound_is_passed_to_search(schedule, monkeypatch):
+    find = schedule.resource_map.find_earliest_start_time
+    lower_bounds = []
+
+    def spy(node_size, length, last_start, lower_bound=0):
+        lower_bounds.append(lower_bound)
+        return find(node_size, length, last_start, lower_bound)
+
+    monkeypatch.setattr(schedule.resource_map, "find_earliest_start_time", spy)
+    assert schedule._find_earliest_start_time(job(1, 2)) == 3
+    # (1, 2) が 3 より前に割り当てられないので、(3, 2) は 3 から探す
+    assert schedule._find_earliest_start_time(job(3, 2)) == 6
+    assert lower_bounds == [0, 3]
+    assert find(3, 2, 10) == 6
+    assert schedule.feasibility_cache.misses == 2
+
+
+def test_lower_bound_past_last_start_is_pruned(schedule):
+    assert schedule._find_earliest_start_time(job(3, 2)) == 6
+    # 割り当てられる区間がウィンドウに収まらないので探索しない
+    assert schedule._find_earliest_start_time(job(3, 8)) is None
+    assert schedule.feasibility_cache.pruned == 1
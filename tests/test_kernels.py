@@ -0,0 +1,124 @@
+import numpy as np
+import pytest
+
+from modules import kernels
+from modules.resource_map import DenseResourceMap, ResourceMap
+
+CASES = range(100)
+
+
+@pytest.fixture(params=[True, False], ids=["compiled", "python"])
+def compiled(request):
+    if request.param and not kernels.NUMBA_AVAILABLE:
+        pytest.skip("numba is not installed")
+    return request.param
+
+
+def kernel(function, compiled):
+    """compiled=False の場合は numba でコンパイルする前の Python の関数を使う"""
+    return function if compiled else getattr(function, "py_func", function)
+
+
+def random_case(seed, compiled):
+    """同じ予約をした NumPy の実装のマップと compiled を指定したマップ、探索の引数を返す"""
+    rng = np.random.default_rng(seed)
+    node_size = int(rng.integers(1, 50))
+    timestep_window = int(rng.integers(2, 60))
+    reference = DenseResourceMap(node_size, timestep_window, compiled=False)
+    resource_map = DenseResourceMap(node_size, timestep_window, compiled=compiled)
+    for job_index in range(int(rng.integers(0, 40))):
+        node_indecies = rng.choice(
+            node_size, int(rng.integers(1, node_size + 1)), replace=False
+        )
+        start = int(rng.integers(0, timestep_window))
+        end = int(rng.integers(start + 1, timestep_window + 1))
+        reference.reserve(job_index, node_indecies, start, end)
+        resource_map.reserve(job_index, node_indecies, start, end)
+    start = int(rng.integers(0, timestep_window))
+    args = {
+        "job_size": int(rng.integers(0, node_size + 1)),
+        "start": start,
+        "length": int(rng.integers(0, timestep_window - start + 1)),
+        "node_indecies": np.sort(
+            rng.choice(node_size, int(rng.integers(1, node_size + 1)), replace=False)
+        ),
+    }
+    args["limit"] = None if rng.random() < 0.5 else args["length"]
+    args["last_start"] = timestep_window - max(args["length"], 1)
+    args["lower_bound"] = 0 if rng.random() < 0.5 else int(rng.integers(0, start + 1))
+    return reference, resource_map, args
+
+
+@pytest.mark.parametrize("seed", CASES)
+def test_can_fit(seed, compiled):
+    reference, resource_map, args = random_case(seed, compiled)
+    expected = reference.can_fit(args["job_size"], args["start"], args["length"])
+    assert (
+        bool(
+            kernel(kernels.can_fit, compiled)(
+                reference.map, args["job_size"], args["start"], args["length"]
+            )
+        )
+        == expected
+    )
+    assert (
+        resource_map.can_fit(args["job_size"], args["start"], args["length"])
+        == expected
+    )
+
+
+@pytest.mark.parametrize("seed", CASES)
+def test_find_earliest_start_time(seed, compiled):
+    reference, resource_map, args = random_case(seed, compiled)
+    expected = reference.find_earliest_start_time(
+        args["job_size"], args["length"], args["last_start"], args["lower_bound"]
+    )
+    earliest = kernel(kernels.find_earliest_start_time, compiled)(
+        reference.map,
+        args["job_size"],
+        args["length"],
+        args["last_start"],
+        args["lower_bound"],
+    )
+    assert (None if earliest < 0 else int(earliest)) == expected
+    assert (
+        resource_map.find_earliest_start_time(
+            args["job_size"], args["length"], args["last_start"], args["lower_bound"]
+        )
+        == expected
+    )
+
+
+@pytest.mark.parametrize("seed", CASES)
+def test_free_run_lengths(seed, compiled):
+    reference, resource_map, args = random_case(seed, compiled)
+    expected = reference.free_run_lengths(args["start"], args["limit"])
+    lengths = kernel(kernels.free_run_lengths, compiled)(
+        reference.map, args["start"], -1 if args["limit"] is None else args["limit"]
+    )
+    np.testing.assert_array_equal(lengths, expected)
+    np.testing.assert_array_equal(
+        resource_map.free_run_lengths(args["start"], args["limit"]), expected
+    )
+
+
+@pytest.mark.parametrize("seed", CASES)
+def test_compact_start(seed, compiled):
+    reference, resource_map, args = random_case(seed, compiled)
+    expected = ResourceMap.compact_start(
+        reference, args["node_indecies"], args["start"]
+    )
+    assert (
+        int(
+            kernel(kernels.compact_start, compiled)(
+                reference.map, args["node_indecies"], args["start"]
+            )
+        )
+        == expected
+    )
+    assert resource_map.compact_start(args["node_indecies"], args["start"]) == expected
+
+
+def test_compiled_map_uses_kernels(compiled):
+    resource_map = DenseResourceMap(4, 8, compiled=compiled)
+    assert resource_map.compiled == compiled
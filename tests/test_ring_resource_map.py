@@ -0,0 +1,99 @@
+import numpy as np
+import pytest
+
+from modules.resource_map import DenseResourceMap
+from modules.ring_resource_map import RingResourceMap
+
+NODE_SIZE = 6
+TIMESTEP_WINDOW = 12
+STEPS = 400
+
+
+def load(resource_map, array):
+    """DenseResourceMap の予約を array と同じにする"""
+    resource_map.release(np.arange(NODE_SIZE), 0, TIMESTEP_WINDOW)
+    for node_index, timestep in np.argwhere(array != -1):
+        job_index = int(array[node_index, timestep])
+        resource_map.reserve(job_index, [node_index], timestep, timestep + 1)
+
+
+def advance(array, timesteps):
+    """時間軸を timesteps だけ進めたマップ（末尾は空き列）を返す"""
+    advanced = np.full_like(array, -1)
+    if timesteps < TIMESTEP_WINDOW:
+        advanced[:, : TIMESTEP_WINDOW - timesteps] = array[:, timesteps:]
+    return advanced
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_ring_matches_dense_under_random_updates(seed):
+    rng = np.random.default_rng(seed)
+    ring = RingResourceMap(NODE_SIZE, TIMESTEP_WINDOW)
+    # 探索は総当たりと、列ごとの空き状態を使うものの両方と比べる
+    dense_maps = [
+        DenseResourceMap(NODE_SIZE, TIMESTEP_WINDOW, compiled=False),
+        DenseResourceMap(NODE_SIZE, TIMESTEP_WINDOW, vectorized=True),
+    ]
+    reservations = []
+    wrapped_writes = 0
+    for job_index in range(STEPS):
+        operation = rng.choice(
+            ["reserve", "reserve", "release", "release_job", "advance", "shift"]
+        )
+        if operation in ["reserve", "release", "release_job"]:
+            start = int(rng.integers(0, TIMESTEP_WINDOW))
+            end = int(rng.integers(start + 1, TIMESTEP_WINDOW + 1))
+            node_indecies = np.sort(
+                rng.choice(NODE_SIZE, int(rng.integers(1, NODE_SIZE + 1)), False)
+            )
+            if ring.origin % TIMESTEP_WINDOW + end > TIMESTEP_WINDOW:
+                wrapped_writes += 1
+        if operation == "reserve":
+            ring.reserve(job_index, node_indecies, start, end)
+            for dense in dense_maps:
+                dense.reserve(job_index, node_indecies, start, end)
+            reservations.append(job_index)
+        elif operation == "release":
+            ring.release(node_indecies, start, end)
+            for dense in dense_maps:
+                dense.release(node_indecies, start, end)
+        elif operation == "release_job" and reservations:
+            released_job = int(rng.choice(reservations))
+            ring.release_job(released_job, node_indecies, start, end)
+            expected = dense_maps[0].map.copy()
+            block = expected[node_indecies, start:end]
+            expected[node_indecies, start:end] = np.where(
+                block == released_job, -1, block
+            )
+            for dense in dense_maps:
+                load(dense, expected)
+        elif operation == "advance":
+            timesteps = int(rng.integers(1, TIMESTEP_WINDOW + 2))
+            ring.advance(timesteps)
+            expected = advance(dense_maps[0].map, timesteps)
+            for dense in dense_maps:
+                load(dense, expected)
+        elif operation == "shift":
+            timesteps = int(rng.integers(1, TIMESTEP_WINDOW + 2))
+            ring.shift(timesteps)
+            for dense in dense_maps:
+                dense.shift(timesteps)
+
+        for dense in dense_maps:
+            np.testing.assert_array_equal(ring.to_array(), dense.map)
+        node_size = int(rng.integers(1, NODE_SIZE + 1))
+        length = int(rng.integers(1, TIMESTEP_WINDOW + 1))
+        last_start = TIMESTEP_WINDOW - length
+        lower_bound = int(rng.integers(0, last_start + 1))
+        np.testing.assert_array_equal(
+            ring.candidate_start_times(node_size, length, last_start),
+            dense_maps[1].candidate_start_times(node_size, length, last_start),
+        )
+        for dense in dense_maps:
+            assert ring.find_earliest_start_time(
+                node_size, length, last_start, lower_bound
+            ) == dense.find_earliest_start_time(
+                node_size, length, last_start, lower_bound
+            )
+    # 環状バッファの末尾をまたぐ書き込みを含んでいること
+    assert wrapped_writes > 0
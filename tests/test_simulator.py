@@ -0,0 +1,69 @@
+import json
+import pickle
+
+import numpy as np
+
+from modules import results
+from modules.simulator import Simulator
+
+
+def run_simulator(data, tmp_path, monkeypatch, **options):
+    monkeypatch.chdir(tmp_path)
+    simulator = Simulator(data, 12, 40, 30, 6, 60, **options)
+    simulator.run(0, 0)
+    return simulator
+
+
+def job_results(simulator):
+    return [
+        (job.queued_timestep, job.start_timestep, job.is_backfilled)
+        for job in simulator.workload.jobs
+    ]
+
+
+def test_event_driven_keeps_python_int_timesteps(make_data, tmp_path, monkeypatch):
+    data = make_data(150, 12, 30, seed=6)
+    expected = run_simulator(data, tmp_path, monkeypatch)
+    simulator = run_simulator(
+        data, tmp_path, monkeypatch, event_driven=True, profile=True, profile_interval=5
+    )
+    assert job_results(simulator) == job_results(expected)
+    assert type(simulator.schedule.timestep) is int
+    assert all(type(job.start_timestep) is int for job in simulator.workload.jobs)
+    with open(tmp_path / "exp0-method0-profile.json") as f:
+        series = json.load(f)["series"]
+    assert series and all(type(row["timestep"]) is int for row in series)
+
+
+def test_columnar_workload_keeps_nodes_in_csr_arrays(make_data, tmp_path, monkeypatch):
+    data = make_data(150, 12, 30, seed=6)
+    expected = run_simulator(data, tmp_path, monkeypatch)
+    simulator = run_simulator(data, tmp_path, monkeypatch, columnar_workload=True)
+    assert job_results(simulator) == job_results(expected)
+    expected_nodes = [job.allocated_node_indecies for job in expected.workload.jobs]
+    workload = simulator.workload
+    assert workload.allocated_node_indecies.dtype == np.int32
+    assert [
+        job.allocated_node_indecies.tolist() for job in workload.jobs
+    ] == expected_nodes
+    assert (
+        results.job_results(workload)["allocated_node_indecies"].tolist()
+        == expected_nodes
+    )
+    # 復元した JobView も復元した配列を参照する
+    job = workload.jobs[0]
+    restored_workload, restored_job = pickle.loads(pickle.dumps((workload, job)))
+    assert restored_job.allocated_node_indecies.tolist() == expected_nodes[0]
+    assert restored_job.allocated_node_indecies.base is (
+        restored_workload.allocated_node_indecies
+    )
+
+
+def test_progress_path_keeps_cwd_clean(make_data, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    progress_path = tmp_path / "progress" / "run.txt"
+    progress_path.parent.mkdir()
+    simulator = Simulator(make_data(50, 12, 30), 12, 40, 30, 6, 60)
+    simulator.run(0, 0, progress_path=progress_path)
+    assert progress_path.read_text()
+    assert not list(tmp_path.glob("*-progress.txt"))
@@ -0,0 +1,95 @@
+import random
+
+import pytest
+
+import models
+from models import Job, JobScheduler, SchedTimeType
+from start_time_prediction import predict_start_times
+
+# (id, node_amount, req_runtime, act_runtime, submitted_time_offset, pred_runtime)
+# 実行時間0のジョブ（投入時刻に開始してすぐ終了する）を含む
+FINISHED_JOBS_TRACE = [
+    (0, 2, 5, 4, 0, 4),
+    (1, 2, 6, 3, 0, 2),
+    (2, 1, 4, 0, 3, 1),
+    (3, 3, 5, 2, 3, 3),
+    (4, 1, 3, 0, 0, 2),
+    (5, 2, 4, 3, 4, 4),
+    (6, 1, 2, 0, 2, 0),
+    (7, 4, 6, 5, 6, 7),
+    (8, 1, 3, 0, 5, 3),
+    (9, 2, 5, 4, 1, 2),
+]
+
+
+def scheduled_jobs(rows, nodes_count):
+    scheduler = JobScheduler(nodes_count, [Job(*row) for row in rows])
+    scheduler.schedule(SchedTimeType.ACT, scheduler.job_data)
+    return scheduler
+
+
+def legacy_start_times(rows, nodes_count):
+    scheduler = scheduled_jobs(rows, nodes_count)
+    jobs = [
+        scheduler.calc_start_time(job, scheduler.job_data) for job in scheduler.job_data
+    ]
+    return [
+        (job.id, job.start_time_sched, job.start_time_pred)
+        for job in jobs
+        if job is not None
+    ]
+
+
+def predicted_start_times(rows, nodes_count, processes=1):
+    scheduler = scheduled_jobs(rows, nodes_count)
+    jobs = predict_start_times(scheduler.job_data, nodes_count, processes=processes)
+    return [(job.id, job.start_time_sched, job.start_time_pred) for job in jobs]
+
+
+def random_trace(seed):
+    rnd = random.Random(seed)
+    nodes_count = rnd.randint(1, 8)
+    rows = []
+    for job_id in range(rnd.randint(1, 40)):
+        req_runtime = rnd.randint(1, 10)
+        act_runtime = 0 if rnd.random() < 0.2 else rnd.randint(0, req_runtime)
+        rows.append(
+            (
+                job_id,
+                rnd.randint(1, nodes_count),
+                req_runtime,
+                act_runtime,
+                rnd.randint(0, 12),
+                rnd.randint(-2, req_runtime + 3),
+            )
+        )
+    return rows, nodes_count
+
+
+@pytest.fixture(autouse=True)
+def quiet_legacy(monkeypatch):
+    monkeypatch.setattr(models, "DEBUG", 0)
+
+
+def test_finished_jobs_match_calc_start_time():
+    expected = legacy_start_times(FINISHED_JOBS_TRACE, 4)
+    # 投入時刻に終了している対象のジョブは0になる
+    assert any(
+        sched == 0 and pred == 0 for job_id, sched, pred in expected if job_id > 0
+    )
+    assert predicted_start_times(FINISHED_JOBS_TRACE, 4) == expected
+
+
+@pytest.mark.parametrize("seed", range(30))
+def test_random_traces_match_calc_start_time(seed):
+    rows, nodes_count = random_trace(seed)
+    assert predicted_start_times(rows, nodes_count) == legacy_start_times(
+        rows, nodes_count
+    )
+
+
+def test_process_pool_matches_serial():
+    rows, nodes_count = random_trace(0)
+    assert predicted_start_times(rows, nodes_count, processes=2) == (
+        predicted_start_times(rows, nodes_count)
+    )
@@ -0,0 +1,67 @@
+import pandas as pd
+import pytest
+
+from modules.dataset import read_parquet_batches
+from modules.job import StreamingWorkload
+from modules.results import CsvResultWriter
+from modules.simulator import Simulator
+
+
+def test_read_jobs_builds_only_requested_rows(make_data):
+    workload = StreamingWorkload(iter([make_data(1000, 8, 20)]), 60)
+    jobs = workload.read_jobs(3)
+    assert [job.job_index for job in jobs] == [0, 1, 2]
+    assert workload.loaded_job_count == 3
+    assert [job.job_index for job in workload.read_jobs(2)] == [3, 4]
+
+
+def test_read_jobs_spans_chunks(make_data):
+    data = make_data(10, 8, 20)
+    workload = StreamingWorkload(
+        iter([data.iloc[:4], data.iloc[4:4], data.iloc[4:]]), 60
+    )
+    jobs = workload.read_jobs(6) + workload.read_jobs(10)
+    assert [job.log_id for job in jobs] == data["log_id"].tolist()
+    assert workload.read_jobs(1) == []
+
+
+def test_streaming_matches_in_memory_run(make_data, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    data = make_data(150, 12, 30, seed=6)
+    expected = Simulator(data, 12, 40, 30, 6, 60)
+    expected.run(0, 0)
+    simulator = Simulator(
+        iter([data]),
+        12,
+        40,
+        30,
+        6,
+        60,
+        streaming=True,
+        result_writer=CsvResultWriter(str(tmp_path / "results.csv"), buffer_size=7),
+    )
+    simulator.run(0, 1)
+    results = pd.read_csv(tmp_path / "results.csv").sort_values("job_index")
+    assert results["start_timestep"].tolist() == [
+        job.start_timestep for job in expected.workload.jobs
+    ]
+    assert results["is_backfilled"].tolist() == [
+        job.is_backfilled for job in expected.workload.jobs
+    ]
+
+
+def test_read_parquet_batches_ignores_row_groups(make_data, tmp_path):
+    pytest.importorskip("pyarrow")
+    data = make_data(1000, 8, 20)
+    path = tmp_path / "jobs.parquet"
+    # 行グループは1つだけ
+    data.to_parquet(path, row_group_size=len(data))
+    chunks = list(read_parquet_batches(str(path), batch_size=128))
+    assert max(len(chunk) for chunk in chunks) == 128
+    pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), data)
+
+
+def test_streaming_arrival_requires_submit_time(make_data):
+    chunks = iter([make_data(10, 8, 20, seed=seed) for seed in range(5)])
+    with pytest.raises(ValueError, match="submit_time"):
+        Simulator(chunks, 12, 40, 30, 6, 60, streaming=True, arrival=True)